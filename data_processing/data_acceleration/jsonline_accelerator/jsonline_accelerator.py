@@ -4,12 +4,15 @@
 
 from __future__ import annotations
 
+import os
 import math
+import shutil
 import jsonlines
 from pathlib import Path
 
 from typing import TYPE_CHECKING
-# if TYPE_CHECKING:
+if TYPE_CHECKING:
+    from collections.abc import Iterator
 
 
 class JsonlineAccelerator:
@@ -49,12 +52,11 @@ class JsonlineAccelerator:
         # 处理路径。
         input_dir = Path(input_dir)
         output_file_path = Path(output_file_path)
-        # 读取每一个jsonl文件。
+        # 按编号顺序读取每一个jsonl文件。
         data = []
-        for input_file_path in input_dir.iterdir():
-            if input_file_path.is_file() and input_file_path.suffix == '.jsonl':
-                with jsonlines.open(input_file_path, 'r') as reader:
-                    data.append(list(reader))
+        for input_file_path in JsonlineAccelerator.get_sorted_jsonl_file_paths(input_dir):
+            with jsonlines.open(input_file_path, 'r') as reader:
+                data.extend(reader)
         # 将结果写入目标文件。
         with jsonlines.open(output_file_path, 'w') as writer:
             writer.write_all(data)
@@ -64,15 +66,281 @@ class JsonlineAccelerator:
         input_file_path: str | Path,
         output_dir: str | Path,
         num_files: int,
+        buffer_size: int = 16 * 1024 * 1024,
     ) -> None:
+        """
+        流式切分大型jsonl文件。
+
+        仅按字节处理每一行，不解析json，峰值内存与文件大小无关。
+        按照字节数均衡地切分为连续的多个文件，保持原始的行顺序，按编号合并即可还原。
+
+        Args:
+            input_file_path (Union[str, Path]): 原始jsonl文件路径。
+            output_dir (Union[str, Path]): 保存切分结果的文件夹，文件约定命名为数字编号。
+            num_files (int): 切分的文件数量。
+            buffer_size (int): 读写文件使用的缓冲区大小。
+
+        Returns:
+            None: 切分结果保存至output_dir。
+        """
+        # 处理路径。
         input_file_path = Path(input_file_path)
         output_dir = Path(output_dir)
         output_dir.mkdir(exist_ok=True, parents=True)
+        # 根据文件字节数决定每个chunk大小。
+        total_size = input_file_path.stat().st_size
+        chunk_size = max(math.ceil(total_size / num_files), 1)
+        # 逐行写入，累计字节数达到边界时切换到下一个文件。
+        file_index = 0
+        read_size = 0
+        writer = None
+        with open(input_file_path, 'rb', buffering=buffer_size) as reader:
+            for line in reader:
+                read_size += len(line)
+                # 跳过空行。
+                if not line.strip():
+                    continue
+                if writer is None:
+                    output_path = output_dir / f'{file_index}.jsonl'
+                    writer = open(output_path, 'wb', buffering=buffer_size)
+                # 保证每一行以换行符结束。
+                if not line.endswith(b'\n'):
+                    line += b'\n'
+                writer.write(line)
+                if read_size >= (file_index + 1) * chunk_size and file_index < num_files - 1:
+                    writer.close()
+                    print(f"Saved {file_index} in {output_path}")
+                    writer = None
+                    file_index += 1
+        if writer is not None:
+            writer.close()
+            print(f"Saved {file_index} in {output_path}")
 
     @staticmethod
     def concat_big_jsonl_files(
         input_dir: str | Path,
         output_file_path: str | Path,
     ) -> None:
-        ...
+        """
+        流式合并一个文件夹下的jsonl文件。
+
+        按照编号的数值顺序合并(0.jsonl, 1.jsonl, ..., 10.jsonl)，与split_big_jsonl_file的切分结果对应。
+
+        Args:
+            input_dir (Union[str, Path]): 需要合并的文件夹。
+            output_file_path (Union[str, Path]): 合并结果的保存路径。
+
+        Returns:
+            None: 合并结果保存至output_file_path。
+        """
+        JsonlineAccelerator.concat_jsonl_file_paths(
+            input_file_paths=JsonlineAccelerator.get_sorted_jsonl_file_paths(input_dir),
+            output_file_path=output_file_path,
+        )
+
+    @staticmethod
+    def concat_jsonl_file_paths(
+        input_file_paths: list[str | Path],
+        output_file_path: str | Path,
+        buffer_size: int = 16 * 1024 * 1024,
+    ) -> None:
+        """
+        按照给定顺序流式合并多个jsonl文件。
+
+        直接复制原始字节，不解析json。
+        优先使用os.copy_file_range或os.sendfile在内核中复制，不可用时使用缓冲区复制。
+        缺少结尾换行符的文件会补充换行符，保证合并结果的每一行都是一条记录。
+
+        Args:
+            input_file_paths (list[Union[str, Path]]): 按顺序需要合并的文件。
+            output_file_path (Union[str, Path]): 合并结果的保存路径。
+            buffer_size (int): 缓冲区复制使用的缓冲区大小。
+
+        Returns:
+            None: 合并结果保存至output_file_path。
+        """
+        output_file_path = Path(output_file_path)
+        output_file_path.parent.mkdir(exist_ok=True, parents=True)
+        # 不使用缓冲，避免与内核复制的写入位置不一致。
+        with open(output_file_path, 'wb', buffering=0) as writer:
+            for input_file_path in input_file_paths:
+                with open(input_file_path, 'rb', buffering=0) as reader:
+                    size = os.fstat(reader.fileno()).st_size
+                    if size == 0:
+                        continue
+                    JsonlineAccelerator.copy_file_bytes(
+                        reader=reader,
+                        writer=writer,
+                        size=size,
+                        buffer_size=buffer_size,
+                    )
+                    # 补充结尾换行符。
+                    reader.seek(size - 1)
+                    if reader.read(1) != b'\n':
+                        writer.write(b'\n')
+        print(f"Saved {output_file_path}")
+
+    # ====工具方法。====
+    @staticmethod
+    def copy_file_bytes(
+        reader,
+        writer,
+        size: int,
+        buffer_size: int,
+    ) -> None:
+        """
+        从reader的当前位置复制size个字节到writer。
+
+        依次尝试os.copy_file_range、os.sendfile，不支持时(如跨文件系统)退回到shutil.copyfileobj。
+
+        Args:
+            reader: 以无缓冲二进制模式打开的源文件。
+            writer: 以无缓冲二进制模式打开的目标文件。
+            size (int): 需要复制的字节数。
+            buffer_size (int): 缓冲区复制使用的缓冲区大小。
+        """
+        remaining = size
+        # 不同平台支持的方法不同，例如macOS没有os.copy_file_range。
+        copy_file_range = getattr(os, 'copy_file_range', None)
+        for kernel_copy in (copy_file_range, getattr(os, 'sendfile', None)):
+            if kernel_copy is None:
+                continue
+            try:
+                while remaining > 0:
+                    if kernel_copy is copy_file_range:
+                        copied = kernel_copy(reader.fileno(), writer.fileno(), remaining)
+                    else:
+                        copied = kernel_copy(writer.fileno(), reader.fileno(), None, remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                return
+            except OSError:
+                # 已复制的部分会推进文件位置，剩余部分交给下一种方法。
+                continue
+        shutil.copyfileobj(reader, writer, buffer_size)
+
+    # ====工具方法。====
+    @staticmethod
+    def get_sorted_jsonl_file_paths(
+        input_dir: str | Path,
+    ) -> list[Path]:
+        """
+        获取文件夹下的jsonl文件，按照编号的数值顺序排序。
+
+        非数字命名的文件按照文件名排在数字编号之后。
+
+        Args:
+            input_dir (Union[str, Path]): 目标文件夹。
+
+        Returns:
+            list[Path]: 排序后的jsonl文件路径。
+        """
+        input_dir = Path(input_dir)
+        input_file_paths = [
+            input_file_path for input_file_path in input_dir.iterdir()
+            if input_file_path.is_file() and input_file_path.suffix == '.jsonl'
+        ]
+        return sorted(
+            input_file_paths,
+            key=lambda input_file_path: (
+                (0, int(input_file_path.stem), '') if input_file_path.stem.isdigit()
+                else (1, 0, input_file_path.name)
+            ),
+        )
+
+    # ====基于字节范围的读取方法。====
+    @staticmethod
+    def get_jsonl_byte_ranges(
+        input_file_path: str | Path,
+        num_ranges: int,
+    ) -> list[tuple[int, int]]:
+        """
+        将jsonl文件划分为多个按行对齐的字节范围。
+
+        不进行预先切分，仅通过seek定位到均分位置，再向后查找下一个换行符作为边界。
+        各个进程可以直接读取原始文件中属于自己的范围，不需要复制文件。
+
+        Args:
+            input_file_path (Union[str, Path]): 原始jsonl文件路径。
+            num_ranges (int): 划分的范围数量。
+
+        Returns:
+            list[tuple[int, int]]: 按顺序排列的[start, end)字节范围。会去除空范围，因此数量可能少于num_ranges。
+        """
+        input_file_path = Path(input_file_path)
+        total_size = input_file_path.stat().st_size
+        boundaries = [0]
+        with open(input_file_path, 'rb') as reader:
+            for i in range(1, num_ranges):
+                offset = i * total_size // num_ranges
+                if offset <= boundaries[-1]:
+                    continue
+                # 从前一个字节开始读取一行，如果恰好位于行首，则边界即为offset。
+                reader.seek(offset - 1)
+                reader.readline()
+                boundaries.append(min(reader.tell(), total_size))
+        boundaries.append(total_size)
+        byte_ranges = [
+            (start, end)
+            for start, end in zip(boundaries[:-1], boundaries[1:])
+            if start < end
+        ]
+        return byte_ranges
+
+    @staticmethod
+    def iter_jsonl_byte_range_lines(
+        input_file_path: str | Path,
+        start: int,
+        end: int,
+        buffer_size: int = 1024 * 1024,
+    ) -> Iterator[bytes]:
+        """
+        流式读取一个字节范围内的原始行。
+
+        Args:
+            input_file_path (Union[str, Path]): 原始jsonl文件路径。
+            start (int): 范围起点，需要位于行首。
+            end (int): 范围终点，不包含。
+            buffer_size (int): 读取文件使用的缓冲区大小。
+
+        Returns:
+            Iterator[bytes]: 范围内的每一行，不进行解析，跳过空行。
+        """
+        with open(input_file_path, 'rb', buffering=buffer_size) as reader:
+            reader.seek(start)
+            position = start
+            while position < end:
+                line = reader.readline()
+                if not line:
+                    break
+                position += len(line)
+                if line.strip():
+                    yield line
+
+    @staticmethod
+    def read_jsonl_byte_range(
+        input_file_path: str | Path,
+        start: int,
+        end: int,
+    ) -> Iterator:
+        """
+        流式读取并解析一个字节范围内的jsonl记录。
+
+        一般与get_jsonl_byte_ranges一起使用，在各个进程中分别读取。
+
+        Args:
+            input_file_path (Union[str, Path]): 原始jsonl文件路径。
+            start (int): 范围起点，需要位于行首。
+            end (int): 范围终点，不包含。
 
+        Returns:
+            Iterator: 按顺序解析的每一条记录。
+        """
+        lines = JsonlineAccelerator.iter_jsonl_byte_range_lines(
+            input_file_path=input_file_path,
+            start=start,
+            end=end,
+        )
+        with jsonlines.Reader(lines) as reader:
+            yield from reader
@@ -0,0 +1,241 @@
+"""
+基于jsonline文件的map-reduce执行器。
+
+将用户提供的函数分发到多个进程中执行:
+    - map: 每个进程流式读取原始文件的一个字节范围，或者一个已经切分的文件，将结果写入各自的结果文件。
+    - reduce: 使用JsonlineAccelerator合并各个进程的结果文件。
+
+约定:
+    - func需要可以被pickle，即定义在模块顶层的函数。
+    - 逐条处理时，func接收一条记录，返回一条结果，返回None表示丢弃该记录。
+    - 按批处理时，func接收一批记录的列表，返回一批结果的可迭代对象，数量可以与输入不同，返回None表示丢弃整批。
+"""
+
+from __future__ import annotations
+
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from .jsonline_accelerator import JsonlineAccelerator
+from .jsonline_processor import JsonlineWriter
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class JsonlineMapReduceExecutor:
+    # ====暴露方法。====
+    @staticmethod
+    def map_reduce_jsonl_file(
+        input_file_path: str | Path,
+        output_file_path: str | Path,
+        func: Callable,
+        num_workers: int,
+        batch_size: int | None = None,
+        preserve_order: bool = True,
+        temp_dir: str | Path | None = None,
+    ) -> int:
+        """
+        对一个jsonl文件执行map-reduce。
+
+        不进行预先切分，每个进程直接读取原始文件中按行对齐的字节范围。
+
+        Args:
+            input_file_path (Union[str, Path]): 原始jsonl文件路径。
+            output_file_path (Union[str, Path]): 结果的保存路径。
+            func (Callable): 处理方法。
+                batch_size为None时，逐条处理: func(record) -> record | None。
+                否则按批处理: func(records) -> list[record]。
+            num_workers (int): 进程数量，同时也是字节范围的数量。
+            batch_size (Optional[int]): 按批处理时每一批的记录数量。
+            preserve_order (bool): 是否按照输入的顺序合并结果。否则按照完成的顺序合并。
+            temp_dir (Optional[Union[str, Path]]): 中间结果的保存位置，默认为结果文件所在的文件夹。
+
+        Returns:
+            int: 写入结果的记录数量。
+        """
+        byte_ranges = JsonlineAccelerator.get_jsonl_byte_ranges(
+            input_file_path=input_file_path,
+            num_ranges=num_workers,
+        )
+        tasks = [
+            (Path(input_file_path), start, end)
+            for start, end in byte_ranges
+        ]
+        return JsonlineMapReduceExecutor.run_map_reduce_tasks(
+            tasks=tasks,
+            output_file_path=output_file_path,
+            func=func,
+            num_workers=num_workers,
+            batch_size=batch_size,
+            preserve_order=preserve_order,
+            temp_dir=temp_dir,
+        )
+
+    # ====暴露方法。====
+    @staticmethod
+    def map_reduce_jsonl_shards(
+        input_dir: str | Path,
+        output_file_path: str | Path,
+        func: Callable,
+        num_workers: int,
+        batch_size: int | None = None,
+        preserve_order: bool = True,
+        temp_dir: str | Path | None = None,
+    ) -> int:
+        """
+        对一个文件夹下已经切分的jsonl文件执行map-reduce。
+
+        一般与JsonlineAccelerator.split_big_jsonl_file一起使用，按照编号的数值顺序处理。
+
+        Args:
+            input_dir (Union[str, Path]): 切分结果所在的文件夹，文件约定命名为数字编号。
+            output_file_path (Union[str, Path]): 结果的保存路径。
+            func (Callable): 处理方法，与map_reduce_jsonl_file相同。
+            num_workers (int): 进程数量。
+            batch_size (Optional[int]): 按批处理时每一批的记录数量。
+            preserve_order (bool): 是否按照输入的顺序合并结果。否则按照完成的顺序合并。
+            temp_dir (Optional[Union[str, Path]]): 中间结果的保存位置，默认为结果文件所在的文件夹。
+
+        Returns:
+            int: 写入结果的记录数量。
+        """
+        input_file_paths = JsonlineAccelerator.get_sorted_jsonl_file_paths(input_dir)
+        # 一个完整的文件即为一个字节范围。
+        tasks = [
+            (input_file_path, 0, input_file_path.stat().st_size)
+            for input_file_path in input_file_paths
+        ]
+        return JsonlineMapReduceExecutor.run_map_reduce_tasks(
+            tasks=tasks,
+            output_file_path=output_file_path,
+            func=func,
+            num_workers=num_workers,
+            batch_size=batch_size,
+            preserve_order=preserve_order,
+            temp_dir=temp_dir,
+        )
+
+    # ====主要方法。====
+    @staticmethod
+    def run_map_reduce_tasks(
+        tasks: list[tuple[Path, int, int]],
+        output_file_path: str | Path,
+        func: Callable,
+        num_workers: int,
+        batch_size: int | None,
+        preserve_order: bool,
+        temp_dir: str | Path | None,
+    ) -> int:
+        """
+        使用进程池执行多个map任务，并合并结果文件。
+
+        Args:
+            tasks (list[tuple[Path, int, int]]): 每个任务的(文件路径, 起点, 终点)。
+            output_file_path (Union[str, Path]): 结果的保存路径。
+            func (Callable): 处理方法。
+            num_workers (int): 进程数量。
+            batch_size (Optional[int]): 按批处理时每一批的记录数量。
+            preserve_order (bool): 是否按照输入的顺序合并结果。
+            temp_dir (Optional[Union[str, Path]]): 中间结果的保存位置。
+
+        Returns:
+            int: 写入结果的记录数量。
+        """
+        output_file_path = Path(output_file_path)
+        output_file_path.parent.mkdir(exist_ok=True, parents=True)
+        # 中间结果默认与结果文件位于同一文件系统，便于快速复制。
+        temp_dir = Path(temp_dir) if temp_dir is not None else output_file_path.parent
+        with tempfile.TemporaryDirectory(dir=temp_dir) as map_dir:
+            map_dir = Path(map_dir)
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                futures = {
+                    executor.submit(
+                        JsonlineMapReduceExecutor.map_jsonl_byte_range,
+                        input_file_path=input_file_path,
+                        start=start,
+                        end=end,
+                        output_file_path=map_dir / f'{i}.jsonl',
+                        func=func,
+                        batch_size=batch_size,
+                    ): map_dir / f'{i}.jsonl'
+                    for i, (input_file_path, start, end) in enumerate(tasks)
+                }
+                # 按照完成的顺序记录结果文件。
+                completed_file_paths = []
+                num_records = 0
+                for future in as_completed(futures):
+                    num_records += future.result()
+                    completed_file_paths.append(futures[future])
+                    print(f"Mapped {futures[future]}")
+            # 合并结果。
+            if preserve_order:
+                JsonlineAccelerator.concat_big_jsonl_files(
+                    input_dir=map_dir,
+                    output_file_path=output_file_path,
+                )
+            else:
+                JsonlineAccelerator.concat_jsonl_file_paths(
+                    input_file_paths=completed_file_paths,
+                    output_file_path=output_file_path,
+                )
+        return num_records
+
+    # ====基础方法。在子进程中执行。====
+    @staticmethod
+    def map_jsonl_byte_range(
+        input_file_path: str | Path,
+        start: int,
+        end: int,
+        output_file_path: str | Path,
+        func: Callable,
+        batch_size: int | None,
+    ) -> int:
+        """
+        对一个字节范围内的记录执行func，并将结果写入结果文件。
+
+        Args:
+            input_file_path (Union[str, Path]): 原始jsonl文件路径。
+            start (int): 范围起点。
+            end (int): 范围终点，不包含。
+            output_file_path (Union[str, Path]): 这个范围的结果文件路径。
+            func (Callable): 处理方法。
+            batch_size (Optional[int]): 按批处理时每一批的记录数量，None为逐条处理。
+
+        Returns:
+            int: 写入结果的记录数量。
+        """
+        records = JsonlineAccelerator.read_jsonl_byte_range(
+            input_file_path=input_file_path,
+            start=start,
+            end=end,
+        )
+        num_records = 0
+        with JsonlineWriter(output_file_path, mode='w') as writer:
+            if batch_size is None:
+                for record in records:
+                    result = func(record)
+                    if result is not None:
+                        writer.write(result)
+                        num_records += 1
+            else:
+                while batch := list(itertools.islice(records, batch_size)):
+                    results = func(batch)
+                    if results is None:
+                        continue
+                    if isinstance(results, (dict, str, bytes)):
+                        raise TypeError(
+                            f"Batch func must return an iterable of records or None, got {type(results).__name__}"
+                        )
+                    try:
+                        results = list(results)
+                    except TypeError:
+                        raise TypeError(
+                            f"Batch func must return an iterable of records or None, got {type(results).__name__}"
+                        ) from None
+                    writer.write_all(results)
+                    num_records += len(results)
+        return num_records
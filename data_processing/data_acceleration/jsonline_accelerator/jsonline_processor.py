@@ -9,11 +9,19 @@ pip install orjson ujson
 
 from __future__ import annotations
 
+import os
+import json
 import jsonlines
 from pathlib import Path
 
-from typing import TYPE_CHECKING
-# if TYPE_CHECKING:
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from typing import TYPE_CHECKING, Any
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
 
 
 class JsonlineProcessor:
@@ -22,6 +30,130 @@ class JsonlineProcessor:
         records: list[dict],
         path_to_jsonl_file: str | Path,
     ) -> None:
+        """
+        以追加模式写入一批记录。
+
+        每次调用都会打开和关闭文件。需要多次写入时，使用JsonlineWriter。
+        """
         with jsonlines.open(path_to_jsonl_file, "a") as writer:
             writer.write_all(records)
 
+
+class JsonlineWriter:
+    """
+    长期持有文件的jsonl追加写入器。
+
+    将记录序列化后缓存在内存中，达到记录数量或字节数的上限时一次性写入文件，
+    避免每次写入都打开文件和flush。
+
+    使用方法:
+    ```python
+    with JsonlineWriter(path_to_jsonl_file) as writer:
+        for record in records:
+            writer.write(record)
+    ```
+    """
+    def __init__(
+        self,
+        path_to_jsonl_file: str | Path,
+        max_buffer_records: int = 10000,
+        max_buffer_bytes: int = 8 * 1024 * 1024,
+        dumps: Callable[[Any], bytes] | None = None,
+        mode: str = 'a',
+        fsync: bool = False,
+        use_orjson: bool = False,
+    ):
+        """
+        Args:
+            path_to_jsonl_file (Union[str, Path]): jsonl文件路径，会自动处理中间路径的文件夹。
+            max_buffer_records (int): 缓存的记录数量上限。
+            max_buffer_bytes (int): 缓存的字节数上限。
+            dumps (Optional[Callable[[Any], bytes]]): 将一条记录序列化为bytes的方法，不包含换行符。
+                默认使用标准库json，与JsonlineProcessor.add_records的结果一致。
+            mode (str): 'a'为追加写入，'w'为覆盖写入。
+            fsync (bool): 关闭时是否调用os.fsync，保证数据落盘。
+            use_orjson (bool): 未指定dumps时，是否使用更快的orjson，需要安装orjson。
+                与标准库json的区别: NaN和Inf写入为null，而不是NaN和Infinity。
+        """
+        self.path_to_jsonl_file = Path(path_to_jsonl_file)
+        self.max_buffer_records = max_buffer_records
+        self.max_buffer_bytes = max_buffer_bytes
+        self.dumps = dumps if dumps is not None else JsonlineWriter.get_default_dumps(use_orjson)
+        self.mode = mode
+        self.fsync = fsync
+        self._file = None
+        self._buffer: list[bytes] = []
+        self._buffer_bytes = 0
+
+    def __enter__(self) -> JsonlineWriter:
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def open(self) -> None:
+        self.path_to_jsonl_file.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path_to_jsonl_file, f'{self.mode}b')
+
+    def write(
+        self,
+        record: Any,
+    ) -> None:
+        line = self.dumps(record) + b'\n'
+        self._buffer.append(line)
+        self._buffer_bytes += len(line)
+        if (
+            len(self._buffer) >= self.max_buffer_records
+            or self._buffer_bytes >= self.max_buffer_bytes
+        ):
+            self.flush()
+
+    def write_all(
+        self,
+        records: Iterable[Any],
+    ) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        """
+        将缓存的记录写入文件。
+        """
+        if self._buffer:
+            self._file.write(b''.join(self._buffer))
+            self._buffer.clear()
+            self._buffer_bytes = 0
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+    # ====工具方法。====
+    @staticmethod
+    def get_default_dumps(
+        use_orjson: bool = False,
+    ) -> Callable[[Any], bytes]:
+        """
+        获取默认的序列化方法。
+
+        结果不依赖于安装了哪些包，orjson需要显式启用。
+
+        Args:
+            use_orjson (bool): 是否使用orjson。会允许非字符串的key和numpy数组，与标准库json保持接近。
+
+        Returns:
+            Callable[[Any], bytes]: 序列化方法。
+        """
+        if use_orjson:
+            if orjson is None:
+                raise ImportError("use_orjson=True requires orjson: pip install orjson")
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            return lambda record: orjson.dumps(record, option=option)
+        return lambda record: json.dumps(record, ensure_ascii=False).encode('utf-8')
@@ -16,21 +16,33 @@ from __future__ import annotations
 from loguru import logger
 
 import pandas as pd
+import polars as pl
 from pathlib import Path
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal, Mapping
 # if TYPE_CHECKING:
 
 
 class JsonlConverter:
     """
     基于pandas的jsonl转换器。
+
+    csv文件可以选择流式引擎:
+        - pandas: 默认方法，完整加载文件并返回pd.DataFrame。
+        - polars: 基于polars的streaming引擎，scan_csv后直接sink_ndjson。
+        - pyarrow: 基于pyarrow的流式csv读取器，按块转换和写入。
+    流式引擎不在内存中构建完整数据，返回None。
+
+    xlsx文件可以选择引擎:
+        - pandas: 默认方法，只读取第一个sheet并返回pd.DataFrame。
+        - fastexcel: 基于XlsxReader并行读取全部或指定的sheet，返回None。
     """
     # ====暴露方法。====
     @staticmethod
     def auto_convert_and_save_jsonl(
         target_path: str | Path,
-    ) -> pd.DataFrame:
+        engine: Literal['pandas', 'polars', 'pyarrow'] = 'pandas',
+    ) -> pd.DataFrame | None:
         """
         自动识别文件类型，自动转换为jsonl文件。
 
@@ -38,15 +50,17 @@ class JsonlConverter:
 
         Args:
             target_path (Union[str, Path]): 目标文件路径。
+            engine (str): csv文件使用的引擎。非pandas引擎时，xlsx文件使用fastexcel引擎。
 
         Returns:
-            pd.DataFrame: 读取的文件结果。一般可以不使用。
+            Optional[pd.DataFrame]: 读取的文件结果。一般可以不使用。流式引擎返回None。
         """
         target_path = Path(target_path)
         result_path = target_path.with_suffix('.jsonl')
         return JsonlConverter.auto_convert_to_jsonl(
             target_path=target_path,
             result_path=result_path,
+            engine=engine,
         )
 
     # ====暴露方法。====
@@ -54,16 +68,18 @@ class JsonlConverter:
     def auto_convert_to_jsonl(
         target_path: str | Path,
         result_path: str | Path,
-    ) -> pd.DataFrame:
+        engine: Literal['pandas', 'polars', 'pyarrow'] = 'pandas',
+    ) -> pd.DataFrame | None:
         """
         自动识别文件类型，自动转换为jsonl文件。
 
         Args:
             target_path (Union[str, Path]): 目标文件路径。
             result_path (Union[str, Path]): 结果文件指定保存的路径。
+            engine (str): csv文件使用的引擎。非pandas引擎时，xlsx文件使用fastexcel引擎。
 
         Returns:
-            pd.DataFrame: 读取的文件结果。一般可以不使用。
+            Optional[pd.DataFrame]: 读取的文件结果。一般可以不使用。流式引擎返回None。
         """
         target_path = Path(target_path)
         result_path = Path(result_path)
@@ -73,11 +89,13 @@ class JsonlConverter:
             return JsonlConverter.convert_csv_to_jsonl(
                 target_path=target_path,
                 result_path=result_path,
+                engine=engine,
             )
         elif file_extension == '.xlsx':
             return JsonlConverter.convert_xlsx_to_jsonl(
                 target_path=target_path,
                 result_path=result_path,
+                engine='fastexcel' if engine != 'pandas' else 'pandas',
             )
 
     # ====主要方法。====
@@ -85,20 +103,49 @@ class JsonlConverter:
     def convert_csv_to_jsonl(
         target_path: str | Path,
         result_path: str | Path,
-    ) -> pd.DataFrame:
+        engine: Literal['pandas', 'polars', 'pyarrow'] = 'pandas',
+        block_size: int = 64 * 1024 * 1024,
+        schema_overrides: Mapping[str, pl.DataType] | None = None,
+        infer_schema_length: int | None = 100,
+    ) -> pd.DataFrame | None:
         """
         将csv文件转换为jsonl文件。
 
+        流式引擎只根据开头的数据推断类型，之后类型变化的字段(例如由整数变为小数)会报错，
+        需要通过schema_overrides指定类型。
+
         Args:
             target_path (Union[str, Path]): 目标文件路径。
             result_path (Union[str, Path]): 结果文件指定保存的路径。
+            engine (str): 使用的引擎。polars和pyarrow为流式转换，内存占用与文件大小无关。
+            block_size (int): pyarrow引擎每次读取的字节数。
+            schema_overrides (Optional[Mapping[str, pl.DataType]]): 流式引擎中指定字段的类型。
+                pyarrow引擎中转换为对应的arrow类型。
+            infer_schema_length (Optional[int]): polars引擎类型推断读取的行数，None为读取全部。
 
         Returns:
-            pd.DataFrame: 读取的文件结果。一般可以不使用。
+            Optional[pd.DataFrame]: 读取的文件结果。一般可以不使用。流式引擎返回None。
         """
         target_path = Path(target_path)
         result_path = Path(result_path)
         result_path.parent.mkdir(parents=True, exist_ok=True)
+        if engine == 'polars':
+            pl.scan_csv(
+                target_path,
+                schema_overrides=schema_overrides,
+                infer_schema_length=infer_schema_length,
+            ).sink_ndjson(result_path.with_suffix('.jsonl'))
+            print(f"Converted {target_path} to jsonl")
+            return None
+        elif engine == 'pyarrow':
+            JsonlConverter.stream_csv_to_jsonl_by_pyarrow(
+                target_path=target_path,
+                result_path=result_path.with_suffix('.jsonl'),
+                block_size=block_size,
+                schema_overrides=schema_overrides,
+            )
+            print(f"Converted {target_path} to jsonl")
+            return None
         df = pd.read_csv(target_path)
         df.to_json(result_path.with_suffix('.jsonl'), orient='records', lines=True, force_ascii=False)
         print(f"Converted {target_path} to jsonl")
@@ -109,22 +156,84 @@ class JsonlConverter:
     def convert_xlsx_to_jsonl(
         target_path: str | Path,
         result_path: str | Path,
-    ) -> pd.DataFrame:
+        engine: Literal['pandas', 'fastexcel'] = 'pandas',
+        sheet_names: list[str] | None = None,
+        sheet_column: str | None = 'sheet',
+        num_workers: int = 4,
+    ) -> pd.DataFrame | None:
         """
         将xlsx文件转换为jsonl文件。
 
         Args:
             target_path (Union[str, Path]): 目标文件路径。
             result_path (Union[str, Path]): 结果文件指定保存的路径。
+            engine (str): 使用的引擎。pandas只读取第一个sheet，以下参数仅对fastexcel引擎有效。
+            sheet_names (Optional[list[str]]): 需要转换的sheet，None为全部。
+            sheet_column (Optional[str]): 合并为一个文件时，记录来源sheet的字段名。
+                为None时，每个sheet保存为一个文件，命名为{result_path.stem}_{sheet_name}.jsonl。
+            num_workers (int): 读取sheet的线程数量。
 
         Returns:
-            pd.DataFrame: 读取的文件结果。一般可以不使用。
+            Optional[pd.DataFrame]: 读取的文件结果。一般可以不使用。fastexcel引擎返回None。
         """
         target_path = Path(target_path)
         result_path = Path(result_path)
         result_path.parent.mkdir(parents=True, exist_ok=True)
+        if engine == 'fastexcel':
+            # 延迟导入，只有xlsx需要fastexcel。
+            from data_processing.xlsx_reader import XlsxReader
+
+            sheets = XlsxReader.read_sheets(
+                target_path=target_path,
+                sheet_names=sheet_names,
+                num_workers=num_workers,
+            )
+            if sheet_column is not None:
+                XlsxReader.concat_sheets(
+                    sheets=sheets,
+                    sheet_column=sheet_column,
+                ).write_ndjson(result_path.with_suffix('.jsonl'))
+            else:
+                for sheet_name, df in sheets.items():
+                    df.write_ndjson(result_path.with_name(f"{result_path.stem}_{sheet_name}.jsonl"))
+            print(f"Converted {target_path} to jsonl")
+            return None
         df = pd.read_excel(target_path)
         df.to_json(result_path.with_suffix('.jsonl'), orient='records', lines=True, force_ascii=False)
         print(f"Converted {target_path} to jsonl")
         return df
 
+    # ====工具方法。====
+    @staticmethod
+    def stream_csv_to_jsonl_by_pyarrow(
+        target_path: str | Path,
+        result_path: str | Path,
+        block_size: int,
+        schema_overrides: Mapping[str, pl.DataType] | None = None,
+    ) -> None:
+        """
+        使用pyarrow的流式csv读取器，按块转换为jsonl文件。
+
+        每次仅在内存中保留一个record batch，序列化由polars完成。
+        pyarrow只根据第一个块推断类型，其余字段需要通过schema_overrides指定。
+
+        Args:
+            target_path (Union[str, Path]): 目标文件路径。
+            result_path (Union[str, Path]): 结果文件指定保存的路径。
+            block_size (int): 每次读取的字节数。
+            schema_overrides (Optional[Mapping[str, pl.DataType]]): 指定字段的类型，转换为对应的arrow类型。
+        """
+        from pyarrow import csv
+
+        column_types = {
+            name: pl.Series(dtype=dtype).to_arrow().type
+            for name, dtype in (schema_overrides or {}).items()
+        }
+        reader = csv.open_csv(
+            target_path,
+            read_options=csv.ReadOptions(block_size=block_size),
+            convert_options=csv.ConvertOptions(column_types=column_types),
+        )
+        with open(result_path, 'wb') as file:
+            for batch in reader:
+                pl.from_arrow(batch).write_ndjson(file)
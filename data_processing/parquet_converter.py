@@ -28,74 +28,435 @@ Notes:
 from __future__ import annotations
 from loguru import logger
 
+import shutil
+import multiprocessing
 import polars as pl
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-from typing import TYPE_CHECKING, Mapping
-# if TYPE_CHECKING:
+from typing import TYPE_CHECKING, Literal, Mapping
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
 
 class ParquetConverter:
     """
     基于 polars 的 parquet 转换器。
     """
+    # 扩展名到转换方法的注册表。通过 register_converter 注册，注册见模块末尾。
+    converters: dict[str, Callable[..., None]] = {}
+
+    # ====暴露方法。====
     @staticmethod
     def convert_and_save_parquet(
         target_path: str | Path,
         result_path: str | Path,
-    ):
+        schema_overrides: Mapping[str, pl.DataType] | None = None,
+        **converter_kwargs,
+    ) -> None:
+        """
+        根据扩展名识别文件格式，分派到对应的转换方法。
+
+        Args:
+            target_path (Union[str, Path]): 原始数据文件路径。
+            result_path (Union[str, Path]): 结果保存路径，会自动处理中间路径的文件夹。
+            schema_overrides (Optional[Mapping[str, pl.DataType]]): 指定字段的类型。
+            **converter_kwargs: 传递给具体转换方法的参数，例如 compression 。
+
+        Returns:
+            None: 保存结果。成功会以日志进行输出。
+        """
         # path processing
         target_path = Path(target_path)
         result_path = Path(result_path)
         result_path.parent.mkdir(parents=True, exist_ok=True)
+        # dispatch
+        converter = ParquetConverter.converters.get(target_path.suffix.lower())
+        if converter is None:
+            raise ValueError(f"Unsupported file format: {target_path}")
+        converter(
+            target_path=target_path,
+            schema_overrides=schema_overrides,
+            result_path=result_path,
+            **converter_kwargs,
+        )
+
+    # ====暴露方法。====
+    @staticmethod
+    def convert_and_save_parquet_dir(
+        target_dir: str | Path,
+        result_dir: str | Path,
+        schema_overrides: Mapping[str, pl.DataType] | None = None,
+        num_workers: int = 4,
+        recursive: bool = False,
+        converter_kwargs_by_suffix: Mapping[str, dict] | None = None,
+        **converter_kwargs,
+    ) -> list[Path]:
+        """
+        并行转换一个文件夹下所有支持格式的文件。
+
+        使用有界的进程池，每个文件由一个进程转换。polars 在每个进程内也会使用多线程，
+        文件较大时可以减少 num_workers ，或通过环境变量 POLARS_MAX_THREADS 限制每个进程的线程数。
+
+        子进程以 spawn 方式启动，当前进程已经使用 polars 后也不会死锁。
+        子进程会重新导入这个模块，通过 register_converter 注册的转换方法，
+        需要在可以被导入的模块中、导入时完成注册，否则子进程中不存在这个转换方法。
+
+        Args:
+            target_dir (Union[str, Path]): 原始数据文件所在的文件夹。
+            result_dir (Union[str, Path]): 结果保存的文件夹，保持与原始文件相同的相对路径，扩展名为 .parquet 。
+            schema_overrides (Optional[Mapping[str, pl.DataType]]): 指定字段的类型，对所有文件生效。
+            num_workers (int): 进程数量。
+            recursive (bool): 是否递归查找子文件夹。
+            converter_kwargs_by_suffix (Optional[Mapping[str, dict]]): 按照扩展名传递给具体转换方法的参数，
+                例如 {'.csv': {'separator': ';'}} 。与 converter_kwargs 同名时优先使用。
+            **converter_kwargs: 传递给所有转换方法的参数，需要所有格式均支持，
+                例如 compression, compression_level, row_group_size 。
+
+        Returns:
+            list[Path]: 成功转换的结果路径。失败的文件会以日志进行输出，并删除结果路径，不中断其他文件的转换。
+        """
+        # path processing
+        target_dir = Path(target_dir)
+        result_dir = Path(result_dir)
+        target_paths = sorted(
+            target_path
+            for target_path in (target_dir.rglob('*') if recursive else target_dir.iterdir())
+            if target_path.is_file() and target_path.suffix.lower() in ParquetConverter.converters
+        )
+        converter_kwargs_by_suffix = {
+            suffix.lower(): kwargs
+            for suffix, kwargs in (converter_kwargs_by_suffix or {}).items()
+        }
+        # convert concurrently
+        result_paths = []
+        # polars 在 fork 的子进程中可能死锁，使用 spawn 启动子进程。
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    ParquetConverter.convert_and_save_parquet,
+                    target_path=target_path,
+                    result_path=(result_dir / target_path.relative_to(target_dir)).with_suffix('.parquet'),
+                    schema_overrides=schema_overrides,
+                    **{
+                        **converter_kwargs,
+                        **converter_kwargs_by_suffix.get(target_path.suffix.lower(), {}),
+                    },
+                ): target_path
+                for target_path in target_paths
+            }
+            for future in as_completed(futures):
+                target_path = futures[future]
+                result_path = (result_dir / target_path.relative_to(target_dir)).with_suffix('.parquet')
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Failed to convert {target_path}: {e!r}")
+                    # 删除不完整或之前运行遗留的结果，避免被当作已经转换的文件。
+                    ParquetConverter.remove_result_path(result_path)
+                    continue
+                result_paths.append(result_path)
+        logger.success(f"Converted {len(result_paths)}/{len(target_paths)} files to {result_dir}")
+        return sorted(result_paths)
 
     @staticmethod
     def convert_and_save_parquet_from_jsonl(
         target_path: str | Path,
         schema_overrides: Mapping[str, pl.DataType],
         result_path: str | Path,
+        infer_schema_length: int | None = 100,
+        row_group_size: int | None = None,
+        compression: Literal['lz4', 'uncompressed', 'snappy', 'gzip', 'brotli', 'zstd'] = 'zstd',
+        compression_level: int | None = None,
     ) -> None:
-        raise NotImplementedError
+        """
+        流式将 jsonl 文件转换为 parquet 文件。
+
+        基于 polars 的 scan_ndjson 和 sink_parquet ，不将完整数据加载到内存中，可以转换大于内存的文件。
+
+        Args:
+            target_path (Union[str, Path]): jsonl 文件路径。
+            schema_overrides (Mapping[str, pl.DataType]): 指定字段的类型，未指定的字段进行类型推断。
+            result_path (Union[str, Path]): 结果保存路径，会自动处理中间路径的文件夹。
+            infer_schema_length (Optional[int]): 类型推断读取的行数，None 为读取全部。
+            row_group_size (Optional[int]): parquet 中每个 row group 的行数。
+                更小的 row group 便于过滤扫描，更大的 row group 压缩率更高。
+            compression (str): 压缩算法。
+            compression_level (Optional[int]): 压缩等级。例如 zstd 为 1-22 ，越高文件越小但写入越慢。
+
+        Returns:
+            None: 保存结果。成功会以日志进行输出。
+        """
+        lf = pl.scan_ndjson(
+            source=target_path,
+            schema_overrides=schema_overrides,
+            infer_schema_length=infer_schema_length,
+        )
+        ParquetConverter.sink_parquet(
+            lf=lf,
+            result_path=result_path,
+            row_group_size=row_group_size,
+            compression=compression,
+            compression_level=compression_level,
+        )
 
     @staticmethod
     def convert_and_save_parquet_from_avro(
         target_path: str | Path,
         schema_overrides: Mapping[str, pl.DataType],
         result_path: str | Path,
+        row_group_size: int | None = None,
+        compression: Literal['lz4', 'uncompressed', 'snappy', 'gzip', 'brotli', 'zstd'] = 'zstd',
+        compression_level: int | None = None,
     ) -> None:
-        raise NotImplementedError
+        """
+        将 avro 文件转换为 parquet 文件。
+
+        polars 没有 avro 的 scan 方法，会将完整数据读取到内存中。
+
+        Args:
+            target_path (Union[str, Path]): avro 文件路径。
+            schema_overrides (Mapping[str, pl.DataType]): 指定字段的类型，读取后进行转换。
+            result_path (Union[str, Path]): 结果保存路径，会自动处理中间路径的文件夹。
+            row_group_size (Optional[int]): parquet 中每个 row group 的行数。
+            compression (str): 压缩算法。
+            compression_level (Optional[int]): 压缩等级。
+
+        Returns:
+            None: 保存结果。成功会以日志进行输出。
+        """
+        df = pl.read_avro(source=target_path)
+        if schema_overrides:
+            df = df.cast(dict(schema_overrides))
+        ParquetConverter.sink_parquet(
+            lf=df.lazy(),
+            result_path=result_path,
+            row_group_size=row_group_size,
+            compression=compression,
+            compression_level=compression_level,
+        )
 
     @staticmethod
     def convert_and_save_parquet_from_json(
         target_path: str | Path,
         schema_overrides: Mapping[str, pl.DataType],
         result_path: str | Path,
+        row_group_size: int | None = None,
+        compression: Literal['lz4', 'uncompressed', 'snappy', 'gzip', 'brotli', 'zstd'] = 'zstd',
+        compression_level: int | None = None,
     ) -> None:
         df = pl.read_json(
             source=target_path,
             schema=schema_overrides,
         )
         logger.trace(f"\ndf: \n{df}")
-        df.write_parquet(
-            result_path,
+        ParquetConverter.sink_parquet(
+            lf=df.lazy(),
+            result_path=result_path,
+            row_group_size=row_group_size,
+            compression=compression,
+            compression_level=compression_level,
         )
-        logger.success(f"Saved parquet file to {result_path}")
 
     @staticmethod
     def convert_and_save_parquet_from_csv(
         target_path: str | Path,
         schema_overrides: Mapping[str, pl.DataType],
         result_path: str | Path,
+        infer_schema: bool = True,
+        infer_schema_length: int | None = 100,
+        separator: str = ',',
+        encoding: Literal['utf8', 'utf8-lossy'] = 'utf8',
+        partition_by: str | list[str] | None = None,
+        row_group_size: int | None = None,
+        compression: Literal['lz4', 'uncompressed', 'snappy', 'gzip', 'brotli', 'zstd'] = 'zstd',
+        compression_level: int | None = None,
     ) -> None:
-        raise NotImplementedError
+        """
+        流式将 csv 文件转换为 parquet 文件。
+
+        基于 polars 的 scan_csv 和 sink_parquet ，由 streaming 引擎多线程并行解析，不将完整数据加载到内存中。
+        线程数由 polars 的线程池决定，可以通过环境变量 POLARS_MAX_THREADS 设置。
+
+        Args:
+            target_path (Union[str, Path]): csv 文件路径。
+            schema_overrides (Mapping[str, pl.DataType]): 预先指定字段的类型。
+            result_path (Union[str, Path]): 结果保存路径，会自动处理中间路径的文件夹。
+                指定 partition_by 时为保存分区结果的文件夹。
+            infer_schema (bool): 是否对未指定的字段进行类型推断。
+                为 False 时不进行类型推断，未在 schema_overrides 中指定的字段均读取为 pl.String 。
+            infer_schema_length (Optional[int]): 类型推断读取的行数，None 为读取全部。
+            separator (str): 分隔符。
+            encoding (str): 文件编码。旧数据库导出的非 utf8 文件可以使用 'utf8-lossy' 。
+            partition_by (Optional[Union[str, list[str]]]): 按照指定字段分区保存为多个文件。
+            row_group_size (Optional[int]): parquet 中每个 row group 的行数。
+            compression (str): 压缩算法。
+            compression_level (Optional[int]): 压缩等级。
+
+        Returns:
+            None: 保存结果。成功会以日志进行输出。
+        """
+        lf = pl.scan_csv(
+            source=target_path,
+            separator=separator,
+            schema_overrides=schema_overrides,
+            infer_schema=infer_schema,
+            infer_schema_length=infer_schema_length,
+            encoding=encoding,
+        )
+        ParquetConverter.sink_parquet(
+            lf=lf,
+            result_path=result_path,
+            partition_by=partition_by,
+            row_group_size=row_group_size,
+            compression=compression,
+            compression_level=compression_level,
+        )
 
     @staticmethod
     def convert_and_save_parquet_from_xlsx(
         target_path: str | Path,
         schema_overrides: Mapping[str, pl.DataType],
         result_path: str | Path,
+        sheet_names: list[str] | None = None,
+        sheet_column: str | None = 'sheet',
+        num_workers: int = 4,
+        row_group_size: int | None = None,
+        compression: Literal['lz4', 'uncompressed', 'snappy', 'gzip', 'brotli', 'zstd'] = 'zstd',
+        compression_level: int | None = None,
+    ) -> None:
+        """
+        将 xlsx 文件的多个 sheet 转换为 parquet 文件。
+
+        基于 fastexcel 在多个 sheet 之间并行读取。
+
+        Args:
+            target_path (Union[str, Path]): xlsx 文件路径。
+            schema_overrides (Mapping[str, pl.DataType]): 指定字段的类型，对所有 sheet 生效。
+            result_path (Union[str, Path]): 结果保存路径，会自动处理中间路径的文件夹。
+            sheet_names (Optional[list[str]]): 需要转换的 sheet ，None 为全部。
+            sheet_column (Optional[str]): 合并为一个文件时，记录来源 sheet 的字段名。
+                为 None 时，每个 sheet 保存为一个文件，命名为 {result_path.stem}_{sheet_name}.parquet 。
+            num_workers (int): 读取 sheet 的线程数量。
+            row_group_size (Optional[int]): parquet 中每个 row group 的行数。
+            compression (str): 压缩算法。
+            compression_level (Optional[int]): 压缩等级。
+
+        Returns:
+            None: 保存结果。成功会以日志进行输出。
+        """
+        result_path = Path(result_path)
+        # 延迟导入，只有 xlsx 需要 fastexcel 。
+        from data_processing.xlsx_reader import XlsxReader
+
+        sheets = XlsxReader.read_sheets(
+            target_path=target_path,
+            sheet_names=sheet_names,
+            schema_overrides=schema_overrides,
+            num_workers=num_workers,
+        )
+        if sheet_column is not None:
+            sheets = {
+                result_path.stem: XlsxReader.concat_sheets(sheets=sheets, sheet_column=sheet_column),
+            }
+        for name, df in sheets.items():
+            ParquetConverter.sink_parquet(
+                lf=df.lazy(),
+                result_path=(
+                    result_path if sheet_column is not None
+                    else result_path.with_name(f"{result_path.stem}_{name}{result_path.suffix}")
+                ),
+                row_group_size=row_group_size,
+                compression=compression,
+                compression_level=compression_level,
+            )
+
+    # ====工具方法。====
+    @staticmethod
+    def sink_parquet(
+        lf: pl.LazyFrame,
+        result_path: str | Path,
+        partition_by: str | list[str] | None = None,
+        row_group_size: int | None = None,
+        compression: Literal['lz4', 'uncompressed', 'snappy', 'gzip', 'brotli', 'zstd'] = 'zstd',
+        compression_level: int | None = None,
+    ) -> None:
+        """
+        以 streaming 方式将 LazyFrame 保存为 parquet 文件。
+
+        Args:
+            lf (pl.LazyFrame): 需要保存的数据。
+            result_path (Union[str, Path]): 结果保存路径，会自动处理中间路径的文件夹。
+                指定 partition_by 时为保存分区结果的文件夹。
+            partition_by (Optional[Union[str, list[str]]]): 按照指定字段分区保存为多个文件。
+            row_group_size (Optional[int]): parquet 中每个 row group 的行数。
+                更小的 row group 便于过滤扫描，更大的 row group 压缩率更高。
+            compression (str): 压缩算法。
+            compression_level (Optional[int]): 压缩等级。例如 zstd 为 1-22 ，越高文件越小但写入越慢。
+
+        Returns:
+            None: 保存结果。成功会以日志进行输出。
+        """
+        # path processing
+        result_path = Path(result_path)
+        if partition_by is None:
+            result_path.parent.mkdir(parents=True, exist_ok=True)
+            path = result_path
+        else:
+            result_path.mkdir(parents=True, exist_ok=True)
+            path = pl.PartitionBy(result_path, key=partition_by)
+        logger.trace(f"\nschema: \n{lf.collect_schema()}")
+        # streaming conversion
+        try:
+            lf.sink_parquet(
+                path,
+                compression=compression,
+                compression_level=compression_level,
+                row_group_size=row_group_size,
+            )
+        except Exception:
+            # 不保留写入一半的结果。
+            ParquetConverter.remove_result_path(result_path)
+            raise
+        logger.success(f"Saved parquet file to {result_path}")
+
+    # ====工具方法。====
+    @staticmethod
+    def remove_result_path(
+        result_path: str | Path,
+    ) -> None:
+        """
+        删除转换失败的结果，结果为分区文件夹时删除整个文件夹。
+        """
+        result_path = Path(result_path)
+        if result_path.is_dir():
+            shutil.rmtree(result_path)
+        else:
+            result_path.unlink(missing_ok=True)
+
+    # ====工具方法。====
+    @staticmethod
+    def register_converter(
+        suffix: str,
+        converter: Callable[..., None],
     ) -> None:
-        raise NotImplementedError
+        """
+        注册一种文件格式的转换方法。
 
+        Args:
+            suffix (str): 文件扩展名，例如 '.csv' 。
+            converter (Callable[..., None]): 转换方法，需要接受 target_path, schema_overrides, result_path 参数。
+                使用 convert_and_save_parquet_dir 时需要可以被 pickle 。
+        """
+        ParquetConverter.converters[suffix.lower()] = converter
 
 
+ParquetConverter.register_converter('.json', ParquetConverter.convert_and_save_parquet_from_json)
+ParquetConverter.register_converter('.jsonl', ParquetConverter.convert_and_save_parquet_from_jsonl)
+ParquetConverter.register_converter('.ndjson', ParquetConverter.convert_and_save_parquet_from_jsonl)
+ParquetConverter.register_converter('.csv', ParquetConverter.convert_and_save_parquet_from_csv)
+ParquetConverter.register_converter('.xlsx', ParquetConverter.convert_and_save_parquet_from_xlsx)
+ParquetConverter.register_converter('.avro', ParquetConverter.convert_and_save_parquet_from_avro)
@@ -26,6 +26,7 @@ from __future__ import annotations
 from loguru import logger
 
 import polars as pl
+import xlsxwriter
 from pathlib import Path
 
 from typing import TYPE_CHECKING
@@ -36,6 +37,9 @@ class XlsxConverter:
     """
     基于 polars 的 xlsx 文件转换器。
     """
+    # excel 单个 sheet 的行数上限，包含表头。
+    max_sheet_rows: int = 1_048_576
+
     @staticmethod
     def convert_and_save_xlsx(
         df: pl.DataFrame,
@@ -63,3 +67,84 @@ class XlsxConverter:
         df.write_excel(result_path)
         logger.success(f"Saved {result_path}")
 
+    @staticmethod
+    def convert_and_save_big_xlsx(
+        df: pl.DataFrame | pl.LazyFrame,
+        result_path: str | Path,
+        sheet_name: str = 'Sheet1',
+        max_rows_per_sheet: int | None = None,
+        batch_size: int = 10000,
+    ) -> None:
+        """
+        流式转换和保存大型 xlsx 文件。
+
+        基于 xlsxwriter 的 constant_memory 模式逐行写入，每写完一行即释放，内存占用与数据大小无关。
+        超过 excel 的行数上限时，自动写入新的 sheet ，命名为 {sheet_name}_2, {sheet_name}_3 ...
+
+        约定:
+            - 支持 LazyFrame: 按批次 collect ，数据不需要完整加载到内存中。
+            - 仅写入数据: 不设置表格样式，宽表也可以快速写入。
+            - 嵌套类型: list 、 struct 等字段写入为 json 字符串。
+
+        Args:
+            df (Union[pl.DataFrame, pl.LazyFrame]): 需要保存的数据。
+            result_path (Union[str, Path]): 结果保存路径。
+                约定扩展名为 .xlsx，会自动处理中间路径的文件夹。
+            sheet_name (str): 第一个 sheet 的名称。
+            max_rows_per_sheet (Optional[int]): 每个 sheet 的数据行数上限，不包含表头。默认为 excel 的上限。
+            batch_size (int): 每次读取的行数。
+
+        Returns:
+            None: 保存结果。不对报错进行处理，成功会以日志进行输出。
+        """
+        # path processing
+        result_path = Path(result_path)
+        result_path.parent.mkdir(parents=True, exist_ok=True)
+        if max_rows_per_sheet is None:
+            max_rows_per_sheet = XlsxConverter.max_sheet_rows - 1
+        # xlsx 不支持嵌套类型，转换为 json 字符串。
+        schema = df.collect_schema()
+        nested_columns = [name for name, dtype in schema.items() if dtype.is_nested()]
+        if nested_columns:
+            df = df.with_columns(
+                pl.struct(pl.col(name).alias('value')).struct.json_encode()
+                .str.json_path_match('$.value').alias(name)
+                for name in nested_columns
+            )
+        # batches
+        if isinstance(df, pl.LazyFrame):
+            columns = df.collect_schema().names()
+            batches = df.collect_batches(chunk_size=batch_size)
+        else:
+            columns = df.columns
+            batches = df.iter_slices(n_rows=batch_size)
+        # save as xlsx
+        workbook = xlsxwriter.Workbook(
+            result_path,
+            {
+                'constant_memory': True,
+                'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+                'remove_timezone': True,
+                # 与 write_excel 一致，NaN/Inf 写入为 excel 的错误值，而不是报错。
+                'nan_inf_to_errors': True,
+            },
+        )
+        worksheet = None
+        sheet_index = 0
+        row_index = 0
+        for batch in batches:
+            for row in batch.iter_rows():
+                # 新建 sheet 并写入表头。
+                if worksheet is None or row_index > max_rows_per_sheet:
+                    sheet_index += 1
+                    worksheet = workbook.add_worksheet(
+                        sheet_name if sheet_index == 1 else f"{sheet_name}_{sheet_index}"
+                    )
+                    worksheet.write_row(0, 0, columns)
+                    row_index = 1
+                worksheet.write_row(row_index, 0, row)
+                row_index += 1
+        if worksheet is None:
+            workbook.add_worksheet(sheet_name).write_row(0, 0, columns)
+        workbook.close()
+        logger.success(f"Saved {result_path}")
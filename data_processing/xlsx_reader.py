@@ -0,0 +1,191 @@
+"""
+Sources:
+    https://github.com/yuliu625/Yu-Data-Science-Toolkit/data_processing/xlsx_reader.py
+
+References:
+    https://github.com/ToucanToco/fastexcel
+
+Synopsis:
+    基于 fastexcel 的 xlsx 文件读取器。
+
+Notes:
+    xlsx 是协作者最常提供的原始数据格式，但 pandas 的 read_excel 基于 openpyxl ，速度很慢，并且默认只读取第一个 sheet 。
+    fastexcel 基于 rust 的 calamine 解析，直接输出 arrow 数据，可以零拷贝转换为 polars 。
+
+    约定:
+        - 多 sheet: 默认读取全部 sheet ，也可以指定需要的 sheet 。
+        - 并行: 在多个 sheet 和多个文件之间使用线程池并行读取。
+        - 输出: 每个 sheet 为一个 pl.DataFrame ，或合并为一个带有 sheet 列的 pl.DataFrame 。
+
+    需要:
+        - 读取: fastexcel
+"""
+
+from __future__ import annotations
+
+import fastexcel
+import polars as pl
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from typing import TYPE_CHECKING, Mapping
+# if TYPE_CHECKING:
+
+
+class XlsxReader:
+    """
+    基于 fastexcel 的 xlsx 文件读取器。
+    """
+    # ====暴露方法。====
+    @staticmethod
+    def read_workbooks(
+        target_paths: list[str | Path],
+        sheet_names: list[str] | None = None,
+        schema_overrides: Mapping[str, pl.DataType] | None = None,
+        num_workers: int = 4,
+    ) -> dict[Path, dict[str, pl.DataFrame]]:
+        """
+        并行读取多个 xlsx 文件的多个 sheet 。
+
+        所有文件的所有 sheet 共享一个线程池。
+
+        Args:
+            target_paths (list[Union[str, Path]]): xlsx 文件路径。
+            sheet_names (Optional[list[str]]): 需要读取的 sheet ，None 为读取全部。对所有文件生效。
+            schema_overrides (Optional[Mapping[str, pl.DataType]]): 指定字段的类型，读取后进行转换。
+            num_workers (int): 线程数量。
+
+        Returns:
+            dict[Path, dict[str, pl.DataFrame]]: 每个文件按照 sheet 顺序的读取结果。
+        """
+        target_paths = [Path(target_path) for target_path in target_paths]
+        tasks = [
+            (target_path, sheet_name)
+            for target_path in target_paths
+            for sheet_name in XlsxReader.get_sheet_names(
+                target_path=target_path,
+                sheet_names=sheet_names,
+            )
+        ]
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            dfs = executor.map(
+                lambda task: XlsxReader.read_sheet(
+                    target_path=task[0],
+                    sheet_name=task[1],
+                    schema_overrides=schema_overrides,
+                ),
+                tasks,
+            )
+            workbooks = {target_path: {} for target_path in target_paths}
+            for (target_path, sheet_name), df in zip(tasks, dfs):
+                workbooks[target_path][sheet_name] = df
+        return workbooks
+
+    # ====暴露方法。====
+    @staticmethod
+    def read_sheets(
+        target_path: str | Path,
+        sheet_names: list[str] | None = None,
+        schema_overrides: Mapping[str, pl.DataType] | None = None,
+        num_workers: int = 4,
+    ) -> dict[str, pl.DataFrame]:
+        """
+        并行读取一个 xlsx 文件的多个 sheet 。
+
+        Args:
+            target_path (Union[str, Path]): xlsx 文件路径。
+            sheet_names (Optional[list[str]]): 需要读取的 sheet ，None 为读取全部。
+            schema_overrides (Optional[Mapping[str, pl.DataType]]): 指定字段的类型，读取后进行转换。
+            num_workers (int): 线程数量。
+
+        Returns:
+            dict[str, pl.DataFrame]: 按照 sheet 顺序的读取结果。
+        """
+        target_path = Path(target_path)
+        return XlsxReader.read_workbooks(
+            target_paths=[target_path],
+            sheet_names=sheet_names,
+            schema_overrides=schema_overrides,
+            num_workers=num_workers,
+        )[target_path]
+
+    # ====基础方法。====
+    @staticmethod
+    def read_sheet(
+        target_path: str | Path,
+        sheet_name: str,
+        schema_overrides: Mapping[str, pl.DataType] | None = None,
+    ) -> pl.DataFrame:
+        """
+        读取一个 sheet 。
+
+        每次调用单独打开文件，便于在多个线程中同时读取。
+
+        Args:
+            target_path (Union[str, Path]): xlsx 文件路径。
+            sheet_name (str): sheet 名称。
+            schema_overrides (Optional[Mapping[str, pl.DataType]]): 指定字段的类型，读取后进行转换。
+
+        Returns:
+            pl.DataFrame: 读取结果。
+        """
+        reader = fastexcel.read_excel(target_path)
+        df = reader.load_sheet(sheet_name).to_polars()
+        if schema_overrides:
+            df = df.cast({
+                column: dtype
+                for column, dtype in schema_overrides.items()
+                if column in df.columns
+            })
+        return df
+
+    # ====工具方法。====
+    @staticmethod
+    def get_sheet_names(
+        target_path: str | Path,
+        sheet_names: list[str] | None = None,
+    ) -> list[str]:
+        """
+        获取需要读取的 sheet 名称。
+
+        Args:
+            target_path (Union[str, Path]): xlsx 文件路径。
+            sheet_names (Optional[list[str]]): 指定的 sheet ，None 为全部。
+
+        Returns:
+            list[str]: 文件中存在的 sheet 名称，保持文件中的顺序。
+        """
+        all_sheet_names = fastexcel.read_excel(target_path).sheet_names
+        if sheet_names is None:
+            return all_sheet_names
+        missing_sheet_names = set(sheet_names) - set(all_sheet_names)
+        if missing_sheet_names:
+            raise ValueError(f"Sheets {sorted(missing_sheet_names)} not found in {target_path}")
+        return [sheet_name for sheet_name in all_sheet_names if sheet_name in sheet_names]
+
+    # ====工具方法。====
+    @staticmethod
+    def concat_sheets(
+        sheets: dict[str, pl.DataFrame],
+        sheet_column: str = 'sheet',
+    ) -> pl.DataFrame:
+        """
+        将多个 sheet 合并为一个 pl.DataFrame 。
+
+        各个 sheet 的字段可以不同，缺失的字段为 null 。
+
+        Args:
+            sheets (dict[str, pl.DataFrame]): 每个 sheet 的读取结果。
+            sheet_column (str): 记录来源 sheet 名称的字段名。
+
+        Returns:
+            pl.DataFrame: 合并结果，sheet_column 为第一列。
+        """
+        return pl.concat(
+            [
+                # 以 sheet 的行数构建，空 sheet 不会产生全为 null 的行。
+                df.select(pl.repeat(sheet_name, df.height, dtype=pl.String).alias(sheet_column), pl.all())
+                for sheet_name, df in sheets.items()
+            ],
+            how='diagonal_relaxed',
+        )
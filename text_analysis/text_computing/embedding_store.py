@@ -0,0 +1,190 @@
+"""
+紧凑的embeddings存储。
+
+将多个分组的embeddings保存为:
+    - embeddings.npy: 连续的float32矩阵，形状为(数量, 维度)，可以以memmap方式打开。
+    - group_codes.npy: int32的分组编号，与embeddings按行对应。
+    - label_names.json: 分组编号对应的分组名称。
+
+相比list[list[list[float]]]，不会为每个浮点数构建python对象，也不需要np.vstack复制，
+降维方法可以直接使用，大规模embeddings可以不完整加载到内存中。
+"""
+
+from __future__ import annotations
+
+import json
+import numpy as np
+from pathlib import Path
+
+from typing import TYPE_CHECKING
+# if TYPE_CHECKING:
+
+
+class EmbeddingStore:
+    """
+    按分组保存的embeddings。
+
+    使用方法:
+    ```python
+    store = EmbeddingStore.create(store_dir, num_rows, dim, label_names)
+    start = 0
+    for label_name, embeddings in groups:
+        start = store.set_rows(start, embeddings, label_name)
+    store.flush()
+    store = EmbeddingStore.load(store_dir)
+    ```
+    """
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        group_codes: np.ndarray,
+        label_names: list[str],
+    ):
+        """
+        Args:
+            embeddings (np.ndarray): 形状为(数量, 维度)的float32矩阵，可以为np.memmap。
+            group_codes (np.ndarray): 长度为数量的int32分组编号。
+            label_names (list[str]): 分组编号对应的分组名称。
+        """
+        self.embeddings = embeddings
+        self.group_codes = group_codes
+        self.label_names = list(label_names)
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    # ====构建方法。====
+    @staticmethod
+    def from_embeddings_list(
+        embeddings_list: list[list[list[float]]],
+        label_names: list[str],
+    ) -> EmbeddingStore:
+        """
+        由按分组的embeddings列表构建内存中的store。
+
+        预先分配float32矩阵并逐组写入，不进行np.vstack。
+
+        Args:
+            embeddings_list (list[list[list[float]]]): 每个分组的一组embedding。
+            label_names (list[str]): 按照输入顺序的分组名称。
+
+        Returns:
+            EmbeddingStore: 内存中的store。
+        """
+        num_rows = sum(len(embeddings) for embeddings in embeddings_list)
+        dim = next((len(embeddings[0]) for embeddings in embeddings_list if len(embeddings)), 0)
+        store = EmbeddingStore(
+            embeddings=np.empty((num_rows, dim), dtype=np.float32),
+            group_codes=np.empty(num_rows, dtype=np.int32),
+            label_names=label_names,
+        )
+        start = 0
+        for embeddings, label_name in zip(embeddings_list, label_names):
+            start = store.set_rows(start, embeddings, label_name)
+        return store
+
+    @staticmethod
+    def create(
+        store_dir: str | Path,
+        num_rows: int,
+        dim: int,
+        label_names: list[str],
+    ) -> EmbeddingStore:
+        """
+        在磁盘上创建一个可写的store，embeddings以memmap方式打开，写入不占用内存。
+
+        Args:
+            store_dir (Union[str, Path]): 保存的文件夹，会自动处理中间路径的文件夹。
+            num_rows (int): embeddings的数量。
+            dim (int): embeddings的维度。
+            label_names (list[str]): 分组编号对应的分组名称。
+
+        Returns:
+            EmbeddingStore: 可写的store，写入后需要调用flush。
+        """
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+        with open(store_dir / 'label_names.json', 'w', encoding='utf-8') as file:
+            json.dump(list(label_names), file, ensure_ascii=False)
+        return EmbeddingStore(
+            embeddings=np.lib.format.open_memmap(
+                store_dir / 'embeddings.npy', mode='w+', dtype=np.float32, shape=(num_rows, dim),
+            ),
+            group_codes=np.lib.format.open_memmap(
+                store_dir / 'group_codes.npy', mode='w+', dtype=np.int32, shape=(num_rows,),
+            ),
+            label_names=label_names,
+        )
+
+    @staticmethod
+    def load(
+        store_dir: str | Path,
+        mmap_mode: str | None = 'r',
+    ) -> EmbeddingStore:
+        """
+        加载已经保存的store。
+
+        Args:
+            store_dir (Union[str, Path]): 保存的文件夹。
+            mmap_mode (Optional[str]): 传递给np.load，默认以只读memmap打开，None为完整加载到内存中。
+
+        Returns:
+            EmbeddingStore: 加载的store。
+        """
+        store_dir = Path(store_dir)
+        with open(store_dir / 'label_names.json', 'r', encoding='utf-8') as file:
+            label_names = json.load(file)
+        return EmbeddingStore(
+            embeddings=np.load(store_dir / 'embeddings.npy', mmap_mode=mmap_mode),
+            group_codes=np.load(store_dir / 'group_codes.npy', mmap_mode=mmap_mode),
+            label_names=label_names,
+        )
+
+    # ====主要方法。====
+    def set_rows(
+        self,
+        start: int,
+        embeddings: list[list[float]] | np.ndarray,
+        label_name: str,
+    ) -> int:
+        """
+        从start开始写入一个分组的embeddings。
+
+        Args:
+            start (int): 写入的起始行。
+            embeddings (Union[list[list[float]], np.ndarray]): 这个分组的一组embedding。
+            label_name (str): 分组名称，需要在label_names中。
+
+        Returns:
+            int: 下一次写入的起始行。
+        """
+        end = start + len(embeddings)
+        if end > start:
+            self.embeddings[start:end] = embeddings
+        self.group_codes[start:end] = self.label_names.index(label_name)
+        return end
+
+    def save(
+        self,
+        store_dir: str | Path,
+    ) -> None:
+        """
+        将内存中的store保存到磁盘，之后可以通过load以memmap方式打开。
+
+        Args:
+            store_dir (Union[str, Path]): 保存的文件夹，会自动处理中间路径的文件夹。
+        """
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+        np.save(store_dir / 'embeddings.npy', np.asarray(self.embeddings, dtype=np.float32))
+        np.save(store_dir / 'group_codes.npy', np.asarray(self.group_codes, dtype=np.int32))
+        with open(store_dir / 'label_names.json', 'w', encoding='utf-8') as file:
+            json.dump(self.label_names, file, ensure_ascii=False)
+
+    def flush(self) -> None:
+        """
+        将memmap的写入同步到磁盘。
+        """
+        for array in (self.embeddings, self.group_codes):
+            if isinstance(array, np.memmap):
+                array.flush()
@@ -1,12 +1,20 @@
 """
 对于高维embeddings降维的方法。
+
+大规模embeddings可以使用EmbeddingStore作为输入，避免构建python列表。
+对于数十万以上的数据:
+    - reduce_dimension_by_sampling: 在每个分组中抽样拟合，再分批转换全部数据。支持pca和umap。
+    - reduce_dimension_by_incremental_pca: 分批拟合IncrementalPCA，可以处理大于内存的数据。
+这两种方法会返回拟合后的reducer，可以传入后续的运行中重复使用。
 """
 
 from __future__ import annotations
 
+from text_analysis.text_computing.embedding_store import EmbeddingStore
+
 import numpy as np
 import pandas as pd
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
 from sklearn.manifold import TSNE
 import umap
 
@@ -17,8 +25,8 @@ from typing import TYPE_CHECKING, Literal
 class EmbeddingsDimensionalityReductionMethod:
     @staticmethod
     def reduce_dimension(
-        embeddings_list: list[list[list[float]]],
-        label_names: list[str],
+        embeddings_list: list[list[list[float]]] | EmbeddingStore,
+        label_names: list[str] | None,
         model_kwargs: dict,
 
         reduce_method: Literal['umap', 'tsne', 'pca'],
@@ -45,8 +53,8 @@ class EmbeddingsDimensionalityReductionMethod:
     # ====暴露方法。====
     @staticmethod
     def reduce_dimension_by_umap(
-        embeddings_list: list[list[list[float]]],
-        label_names: list[str],
+        embeddings_list: list[list[list[float]]] | EmbeddingStore,
+        label_names: list[str] | None,
         model_kwargs: dict,
     ) -> pd.DataFrame:
         all_embeddings, labels = EmbeddingsDimensionalityReductionMethod.get_all_embeddings_and_labels(
@@ -64,8 +72,8 @@ class EmbeddingsDimensionalityReductionMethod:
     # ====暴露方法。====
     @staticmethod
     def reduce_dimension_by_tsne(
-        embeddings_list: list[list[list[float]]],
-        label_names: list[str],
+        embeddings_list: list[list[list[float]]] | EmbeddingStore,
+        label_names: list[str] | None,
         model_kwargs: dict,
     ) -> pd.DataFrame:
         all_embeddings, labels = EmbeddingsDimensionalityReductionMethod.get_all_embeddings_and_labels(
@@ -83,8 +91,8 @@ class EmbeddingsDimensionalityReductionMethod:
     # ====暴露方法。====
     @staticmethod
     def reduce_dimension_by_pca(
-        embeddings_list: list[list[list[float]]],
-        label_names: list[str],
+        embeddings_list: list[list[list[float]]] | EmbeddingStore,
+        label_names: list[str] | None,
         model_kwargs: dict,
     ) -> pd.DataFrame:
         all_embeddings, labels = EmbeddingsDimensionalityReductionMethod.get_all_embeddings_and_labels(
@@ -99,11 +107,154 @@ class EmbeddingsDimensionalityReductionMethod:
         )
         return df
 
+    # ====暴露方法。====
+    @staticmethod
+    def reduce_dimension_by_sampling(
+        embeddings_list: list[list[list[float]]] | EmbeddingStore,
+        label_names: list[str] | None,
+        model_kwargs: dict,
+        reduce_method: Literal['umap', 'pca'],
+        sample_size_per_group: int = 10000,
+        batch_size: int = 100000,
+        random_state: int | None = None,
+        reducer: PCA | umap.UMAP | None = None,
+    ) -> tuple[pd.DataFrame, PCA | umap.UMAP]:
+        """
+        在每个分组中抽样拟合reducer，再分批转换全部数据。
+
+        t-SNE没有transform方法，不支持这种方式。
+
+        Args:
+            embeddings_list (Union[list[list[list[float]]], EmbeddingStore]): 每个分组的一组embedding，或EmbeddingStore。
+            label_names (Optional[list[str]]): 按照输入顺序的分组名称。使用EmbeddingStore时不需要。
+            model_kwargs (dict): 构建reducer的参数。
+            reduce_method (str): 降维方法。
+            sample_size_per_group (int): 每个分组抽样的数量，分组数量较少时使用全部。
+            batch_size (int): 每次转换的数量。
+            random_state (Optional[int]): 抽样使用的随机种子。
+            reducer (Optional[Union[PCA, umap.UMAP]]): 已经拟合的reducer。指定时不再拟合，直接转换。
+
+        Returns:
+            tuple[pd.DataFrame, Union[PCA, umap.UMAP]]: 降维结果和拟合后的reducer。
+        """
+        all_embeddings, labels = EmbeddingsDimensionalityReductionMethod.get_all_embeddings_and_labels(
+            embeddings_list=embeddings_list,
+            label_names=label_names,
+        )
+        if reducer is None:
+            if reduce_method == 'umap':
+                reducer = umap.UMAP(**model_kwargs)
+            elif reduce_method == 'pca':
+                reducer = PCA(**model_kwargs)
+            else:
+                raise ValueError(f"Unsupported reduce_method for sampling: {reduce_method}")
+            sample_indices = EmbeddingsDimensionalityReductionMethod.get_stratified_sample_indices(
+                labels=labels,
+                sample_size_per_group=sample_size_per_group,
+                random_state=random_state,
+            )
+            reducer.fit(all_embeddings[sample_indices])
+        embedding_2d = EmbeddingsDimensionalityReductionMethod.transform_in_batches(
+            reducer=reducer,
+            all_embeddings=all_embeddings,
+            batch_size=batch_size,
+        )
+        df = EmbeddingsDimensionalityReductionMethod.get_df_by_embedding_2d(
+            embedding_2d=embedding_2d,
+            labels=labels,
+        )
+        return df, reducer
+
+    # ====暴露方法。====
+    @staticmethod
+    def reduce_dimension_by_incremental_pca(
+        embeddings_list: list[list[list[float]]] | EmbeddingStore,
+        label_names: list[str] | None,
+        model_kwargs: dict,
+        batch_size: int = 100000,
+        reducer: IncrementalPCA | None = None,
+    ) -> tuple[pd.DataFrame, IncrementalPCA]:
+        """
+        分批拟合和转换IncrementalPCA。
+
+        每次只读取batch_size行，配合以memmap打开的EmbeddingStore，可以处理大于内存的数据。
+
+        Args:
+            embeddings_list (Union[list[list[list[float]]], EmbeddingStore]): 每个分组的一组embedding，或EmbeddingStore。
+            label_names (Optional[list[str]]): 按照输入顺序的分组名称。使用EmbeddingStore时不需要。
+            model_kwargs (dict): 构建IncrementalPCA的参数。
+            batch_size (int): 每次拟合和转换的数量，需要不小于n_components。
+            reducer (Optional[IncrementalPCA]): 已经拟合的reducer。指定时不再拟合，直接转换。
+
+        Returns:
+            tuple[pd.DataFrame, IncrementalPCA]: 降维结果和拟合后的reducer。
+        """
+        all_embeddings, labels = EmbeddingsDimensionalityReductionMethod.get_all_embeddings_and_labels(
+            embeddings_list=embeddings_list,
+            label_names=label_names,
+        )
+        if reducer is None:
+            reducer = IncrementalPCA(**model_kwargs)
+            for start in range(0, all_embeddings.shape[0], batch_size):
+                batch = all_embeddings[start:start + batch_size]
+                # 最后一批数量少于n_components时，无法单独拟合，跳过。
+                if start > 0 and batch.shape[0] < reducer.n_components_:
+                    break
+                reducer.partial_fit(batch)
+        embedding_2d = EmbeddingsDimensionalityReductionMethod.transform_in_batches(
+            reducer=reducer,
+            all_embeddings=all_embeddings,
+            batch_size=batch_size,
+        )
+        df = EmbeddingsDimensionalityReductionMethod.get_df_by_embedding_2d(
+            embedding_2d=embedding_2d,
+            labels=labels,
+        )
+        return df, reducer
+
+    # ====工具方法。====
+    @staticmethod
+    def transform_in_batches(
+        reducer: PCA | IncrementalPCA | umap.UMAP,
+        all_embeddings: np.ndarray,
+        batch_size: int,
+    ) -> np.ndarray:
+        """
+        使用已经拟合的reducer分批转换，每次只读取batch_size行。
+        """
+        return np.concatenate([
+            reducer.transform(all_embeddings[start:start + batch_size])
+            for start in range(0, all_embeddings.shape[0], batch_size)
+        ])
+
+    # ====工具方法。====
+    @staticmethod
+    def get_stratified_sample_indices(
+        labels: np.ndarray | pd.Categorical,
+        sample_size_per_group: int,
+        random_state: int | None = None,
+    ) -> np.ndarray:
+        """
+        在每个分组中无放回地抽样。
+
+        Returns:
+            np.ndarray: 升序排列的抽样行号。
+        """
+        codes, _ = pd.factorize(labels)
+        rng = np.random.default_rng(random_state)
+        sample_indices = []
+        for code in np.unique(codes):
+            group_indices = np.flatnonzero(codes == code)
+            if len(group_indices) > sample_size_per_group:
+                group_indices = rng.choice(group_indices, size=sample_size_per_group, replace=False)
+            sample_indices.append(group_indices)
+        return np.sort(np.concatenate(sample_indices))
+
     # ====工具方法。====
     @staticmethod
     def get_df_by_embedding_2d(
         embedding_2d: np.ndarray,
-        labels: np.ndarray,
+        labels: np.ndarray | pd.Categorical,
     ) -> pd.DataFrame:
         df = pd.DataFrame({
             'x': embedding_2d[:, 0],
@@ -115,9 +266,26 @@ class EmbeddingsDimensionalityReductionMethod:
     # ====工具方法。====
     @staticmethod
     def get_all_embeddings_and_labels(
-        embeddings_list: list[list[list[float]]],
-        label_names: list[str],
-    ) -> tuple[np.ndarray, np.ndarray]:
+        embeddings_list: list[list[list[float]]] | EmbeddingStore,
+        label_names: list[str] | None,
+    ) -> tuple[np.ndarray, np.ndarray | pd.Categorical]:
+        """
+        获取所有的embeddings和每一行对应的分组名称。
+
+        Args:
+            embeddings_list (Union[list[list[list[float]]], EmbeddingStore]): 每个分组的一组embedding，或EmbeddingStore。
+            label_names (Optional[list[str]]): 按照输入顺序的分组名称。使用EmbeddingStore时不需要，使用store中的名称。
+
+        Returns:
+            tuple[np.ndarray, Union[np.ndarray, pd.Categorical]]: 所有的embeddings和分组名称。
+                使用EmbeddingStore时，直接使用其中的矩阵而不复制，分组名称为pd.Categorical，不构建字符串数组。
+        """
+        if isinstance(embeddings_list, EmbeddingStore):
+            labels = pd.Categorical.from_codes(
+                codes=embeddings_list.group_codes,
+                categories=embeddings_list.label_names,
+            )
+            return embeddings_list.embeddings, labels
         groups_embeddings = [
             np.array(embeddings)
             for embeddings in embeddings_list
@@ -1,13 +1,33 @@
 """
 使用keywords对于文本进行规则匹配。
+
+大量keywords时，使用CompiledKeywordsMatcher，一次构建自动机，对每个文本仅扫描一次。
+为了更快的匹配速度，最好安装:
+```shell
+pip install pyahocorasick
+```
 """
 
 from __future__ import annotations
 
 import re
+import itertools
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 from typing import TYPE_CHECKING
-# if TYPE_CHECKING:
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    import polars as pl
+
+# 子进程中使用的matcher，由CompiledKeywordsMatcher.init_worker_matcher设置。
+_worker_matcher: CompiledKeywordsMatcher | None = None
 
 
 class KeywordsMatcher:
@@ -107,8 +127,319 @@ class KeywordsMatcher:
         Returns:
             list[str]: 匹配的结果。实际上是多个完全一样的keyword。
         """
-        # 直接使用keyword作为pattern，进行正则匹配。
-        pattern = keyword
+        # 将keyword转义后作为pattern，避免其中的正则元字符生效。
+        pattern = re.escape(keyword)
         matches = re.findall(pattern, text)
         return matches
 
+
+class CompiledKeywordsMatcher:
+    """
+    基于Aho-Corasick自动机的多keywords匹配器。
+
+    由keywords构建一次，之后对每个文本仅扫描一次，复杂度与keywords的数量无关。
+    结果与KeywordsMatcher一致: 每个keyword单独计数，同一keyword的匹配不重叠，不同keyword之间的匹配可以重叠。
+
+    安装了pyahocorasick时使用其实现，否则使用纯python实现。
+    空字符串的keyword不参与匹配，计数为0。
+    """
+    def __init__(
+        self,
+        keywords: list[str],
+    ):
+        """
+        Args:
+            keywords (list[str]): 需要匹配的多个keywords，按照字面进行匹配。
+        """
+        self.keywords = list(keywords)
+        # 去重后构建自动机，结果再按照输入顺序展开。
+        self.unique_keywords = list(dict.fromkeys(keyword for keyword in self.keywords if keyword))
+        unique_indices = {keyword: i for i, keyword in enumerate(self.unique_keywords)}
+        self.keyword_indices = [unique_indices.get(keyword) for keyword in self.keywords]
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for i, keyword in enumerate(self.unique_keywords):
+                self.automaton.add_word(keyword, i)
+            if self.unique_keywords:
+                self.automaton.make_automaton()
+        else:
+            self.automaton = None
+            self.goto, self.fail, self.output = CompiledKeywordsMatcher.build_automaton(self.unique_keywords)
+
+    # ====暴露方法。====
+    def count_keywords(
+        self,
+        text: str,
+    ) -> list[int]:
+        """
+        计算每一个keyword的命中数量。
+
+        Args:
+            text (str): 原始文本。
+
+        Returns:
+            list[int]: 按照给定的keywords的输入顺序给出命中数量。
+        """
+        unique_counts = self.count_unique_keywords(text)
+        return [
+            unique_counts.get(i, 0) if i is not None else 0
+            for i in self.keyword_indices
+        ]
+
+    # ====暴露方法。====
+    def calculate_matched_keywords_statistics(
+        self,
+        text: str,
+    ) -> tuple[list[int], int, int]:
+        """
+        一次扫描计算每一个keyword的命中数量、命中总数量和命中总长度。
+
+        Args:
+            text (str): 原始文本。
+
+        Returns:
+            tuple[list[int], int, int]: 每一个keyword的命中数量，命中所有keywords的总计数，命中所有keywords的总长度。
+        """
+        keywords_numbers = self.count_keywords(text)
+        matched_keywords_number = sum(keywords_numbers)
+        matched_keywords_length = sum(
+            len(keyword) * number
+            for keyword, number in zip(self.keywords, keywords_numbers)
+        )
+        return keywords_numbers, matched_keywords_number, matched_keywords_length
+
+    def calculate_matched_keywords_number(
+        self,
+        text: str,
+    ) -> int:
+        """
+        计算所有keywords的命中数量。与KeywordsMatcher.calculate_matched_keywords_number一致。
+        """
+        return sum(self.count_keywords(text))
+
+    def calculate_matched_keywords_length(
+        self,
+        text: str,
+    ) -> int:
+        """
+        计算所有keywords的文本长度。与KeywordsMatcher.calculate_matched_keywords_length一致。
+        """
+        return self.calculate_matched_keywords_statistics(text)[2]
+
+    # ====暴露方法。====
+    def count_keywords_matrix(
+        self,
+        texts: Iterable[str | None] | pl.Series,
+        num_workers: int = 1,
+        chunk_size: int = 10000,
+    ) -> sp.csr_matrix:
+        """
+        对一组文本计算文档×keyword的命中数量矩阵。
+
+        结果为稀疏矩阵，每个文本只记录命中的keywords。
+        文本数量较多时，可以使用多个进程，自动机在每个进程中只传递一次。
+
+        Args:
+            texts (Union[Iterable[Optional[str]], pl.Series]): 一组文本，或 polars 的字符串列。None 视为空文本。
+            num_workers (int): 进程数量，为1时在当前进程中计算。
+            chunk_size (int): 每个任务处理的文本数量。
+
+        Returns:
+            sp.csr_matrix: 形状为(文本数量, keywords数量)的命中数量矩阵，列按照给定的keywords的输入顺序。
+        """
+        # 按照chunk_size切分为多个任务。
+        texts = iter(texts)
+        chunks = iter(lambda: list(itertools.islice(texts, chunk_size)), [])
+        if num_workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=num_workers,
+                initializer=CompiledKeywordsMatcher.init_worker_matcher,
+                initargs=(self,),
+            ) as executor:
+                unique_matrices = list(executor.map(
+                    CompiledKeywordsMatcher.count_unique_keywords_matrix_in_worker,
+                    chunks,
+                ))
+        else:
+            unique_matrices = [self.count_unique_keywords_matrix(chunk) for chunk in chunks]
+        unique_matrix = sp.vstack(
+            unique_matrices or [self.count_unique_keywords_matrix([])],
+            format='csr',
+        )
+        # 将去重后的列展开为输入顺序的列。
+        rows = [i for i in self.keyword_indices if i is not None]
+        cols = [j for j, i in enumerate(self.keyword_indices) if i is not None]
+        expansion = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(self.unique_keywords), len(self.keywords)),
+        )
+        return (unique_matrix @ expansion).tocsr()
+
+    # ====暴露方法。====
+    def calculate_matched_keywords_features(
+        self,
+        texts: Iterable[str | None] | pl.Series,
+        num_workers: int = 1,
+        chunk_size: int = 10000,
+    ) -> tuple[sp.csr_matrix, np.ndarray, np.ndarray]:
+        """
+        对一组文本计算keywords特征。
+
+        总计数和总长度由稀疏矩阵的向量化运算得到。
+
+        Args:
+            texts (Union[Iterable[Optional[str]], pl.Series]): 一组文本，或 polars 的字符串列。
+            num_workers (int): 进程数量。
+            chunk_size (int): 每个任务处理的文本数量。
+
+        Returns:
+            tuple[sp.csr_matrix, np.ndarray, np.ndarray]: 命中数量矩阵，每个文本命中所有keywords的总计数，每个文本命中所有keywords的总长度。
+        """
+        matrix = self.count_keywords_matrix(
+            texts=texts,
+            num_workers=num_workers,
+            chunk_size=chunk_size,
+        )
+        keywords_lengths = np.array([len(keyword) for keyword in self.keywords], dtype=np.int64)
+        matched_keywords_numbers = np.asarray(matrix.sum(axis=1)).ravel()
+        matched_keywords_lengths = matrix @ keywords_lengths
+        return matrix, matched_keywords_numbers, matched_keywords_lengths
+
+    # ====基础方法。====
+    def count_unique_keywords(
+        self,
+        text: str,
+    ) -> dict[int, int]:
+        """
+        计算命中的去重后keywords的数量。
+
+        Args:
+            text (str): 原始文本。
+
+        Returns:
+            dict[int, int]: 去重后keyword的序号到命中数量，只包含命中的keywords。
+        """
+        unique_counts = {}
+        last_ends = {}
+        for end, i in self.iter_occurrences(text):
+            # 与re.findall一致，同一keyword的匹配不重叠。
+            if end - len(self.unique_keywords[i]) >= last_ends.get(i, -1):
+                unique_counts[i] = unique_counts.get(i, 0) + 1
+                last_ends[i] = end
+        return unique_counts
+
+    # ====基础方法。====
+    def count_unique_keywords_matrix(
+        self,
+        texts: list[str | None],
+    ) -> sp.csr_matrix:
+        """
+        计算一组文本的文档×去重后keyword的命中数量矩阵。
+
+        Args:
+            texts (list[Optional[str]]): 一组文本。
+
+        Returns:
+            sp.csr_matrix: 形状为(文本数量, 去重后keywords数量)的命中数量矩阵。
+        """
+        indptr = [0]
+        indices = []
+        data = []
+        for text in texts:
+            unique_counts = self.count_unique_keywords(text or '')
+            indices.extend(unique_counts.keys())
+            data.extend(unique_counts.values())
+            indptr.append(len(indices))
+        return sp.csr_matrix(
+            (
+                np.array(data, dtype=np.int32),
+                np.array(indices, dtype=np.int32),
+                np.array(indptr, dtype=np.int64),
+            ),
+            shape=(len(texts), len(self.unique_keywords)),
+        )
+
+    # ====基础方法。====
+    def iter_occurrences(
+        self,
+        text: str,
+    ) -> Iterator[tuple[int, int]]:
+        """
+        扫描一次文本，给出所有keywords的所有出现位置，包括重叠的出现。
+
+        Args:
+            text (str): 原始文本。
+
+        Returns:
+            Iterator[tuple[int, int]]: 按照结束位置排序的(exclusive结束位置, 去重后keyword的序号)。
+        """
+        if not self.unique_keywords:
+            return
+        if self.automaton is not None:
+            for end, i in self.automaton.iter(text):
+                yield end + 1, i
+            return
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for i in output[state]:
+                yield position + 1, i
+
+    # ====工具方法。在子进程中执行。====
+    @staticmethod
+    def init_worker_matcher(
+        matcher: CompiledKeywordsMatcher,
+    ) -> None:
+        """
+        在子进程中保存matcher，避免每个任务重复传递自动机。
+        """
+        global _worker_matcher
+        _worker_matcher = matcher
+
+    @staticmethod
+    def count_unique_keywords_matrix_in_worker(
+        texts: list[str | None],
+    ) -> sp.csr_matrix:
+        return _worker_matcher.count_unique_keywords_matrix(texts)
+
+    # ====工具方法。====
+    @staticmethod
+    def build_automaton(
+        keywords: list[str],
+    ) -> tuple[list[dict[str, int]], list[int], list[list[int]]]:
+        """
+        构建纯python实现的Aho-Corasick自动机。
+
+        Args:
+            keywords (list[str]): 去重后的keywords。
+
+        Returns:
+            tuple[list[dict[str, int]], list[int], list[list[int]]]: 转移表，失败指针，每个状态输出的keyword序号。
+        """
+        goto: list[dict[str, int]] = [{}]
+        output: list[list[int]] = [[]]
+        # 构建trie。
+        for i, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                if char not in goto[state]:
+                    goto.append({})
+                    output.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            output[state].append(i)
+        # 按照广度优先构建失败指针，并合并失败状态的输出。
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, next_state in goto[state].items():
+                fail_state = fail[state]
+                while fail_state and char not in goto[fail_state]:
+                    fail_state = fail[fail_state]
+                fail[next_state] = goto[fail_state].get(char, 0)
+                output[next_state] = output[next_state] + output[fail[next_state]]
+                queue.append(next_state)
+        return goto, fail, output
@@ -1,16 +1,23 @@
 """
 基于正则方法提取文本中进行数值计算的部分。
+
+对于 polars 的字符串列，使用 with_numerical_features ，由 polars 在 rust 中多线程计算，不逐行调用 python 。
 """
 
 from __future__ import annotations
 
 import re
+import polars as pl
 
 from typing import TYPE_CHECKING
 # if TYPE_CHECKING:
 
 
 class NumericalStringExtractor:
+    # 这个模式可以匹配整数、浮点数、带逗号的数字、负数和科学计数法。
+    numerical_pattern: str = r'[-+]?[\d,]+(?:\.\d+)?(?:[eE][-+]?\d+)?'
+    numerical_regex: re.Pattern = re.compile(numerical_pattern)
+
     @staticmethod
     def extract_numerical_strings(
         text: str,
@@ -24,9 +31,7 @@ class NumericalStringExtractor:
         Returns:
             list[str]: 作为字符串的数值列表。
         """
-        # 这个模式可以匹配整数、浮点数、带逗号的数字、负数和科学计数法。
-        pattern = r'[-+]?[\d,]+(?:\.\d+)?(?:[eE][-+]?\d+)?'
-        matches = re.findall(pattern, text)
+        matches = NumericalStringExtractor.numerical_regex.findall(text)
         return matches
 
     @staticmethod
@@ -57,9 +62,63 @@ class NumericalStringExtractor:
         Returns:
             int: 作为字符串的数值的长度累计。
         """
-        count = 0
         numerical_strings = NumericalStringExtractor.extract_numerical_strings(text)
-        for numerical_string in numerical_strings:
-            count += len(numerical_string)
-        return count
+        return sum(map(len, numerical_strings))
+
+    # ====列方法。====
+    @staticmethod
+    def with_numerical_features(
+        df: pl.DataFrame | pl.LazyFrame,
+        column: str,
+        parse_values: bool = False,
+    ) -> pl.DataFrame | pl.LazyFrame:
+        """
+        对一个字符串列计算数值特征，添加为新的列。
+
+        与逐行方法使用相同的模式，结果一致。
+
+        Args:
+            df (Union[pl.DataFrame, pl.LazyFrame]): 原始数据。
+            column (str): 字符串列的名称。
+            parse_values (bool): 是否添加解析后的数值。去除逗号后转换为 pl.Float64 ，无法转换的为 null 。
+
+        Returns:
+            Union[pl.DataFrame, pl.LazyFrame]: 添加了以下列的数据:
+                - {column}_numerical_string_length: 作为字符串的数值数量。
+                - {column}_numerical_char_length: 作为字符串的数值的长度累计。
+                - {column}_numerical_values: 解析后的数值列表，仅在 parse_values 时添加。
+        """
+        return df.with_columns(NumericalStringExtractor.get_numerical_feature_exprs(
+            column=column,
+            parse_values=parse_values,
+        ))
+
+    @staticmethod
+    def get_numerical_feature_exprs(
+        column: str,
+        parse_values: bool = False,
+    ) -> list[pl.Expr]:
+        """
+        构建计算数值特征的 polars 表达式，可以在 select 或 with_columns 中组合使用。
 
+        Args:
+            column (str): 字符串列的名称。
+            parse_values (bool): 是否包含解析后的数值。
+
+        Returns:
+            list[pl.Expr]: 与 with_numerical_features 添加的列相同的表达式。
+        """
+        numerical_strings = pl.col(column).str.extract_all(NumericalStringExtractor.numerical_pattern)
+        exprs = [
+            pl.col(column).str.count_matches(NumericalStringExtractor.numerical_pattern)
+            .alias(f'{column}_numerical_string_length'),
+            numerical_strings.list.eval(pl.element().str.len_chars()).list.sum()
+            .alias(f'{column}_numerical_char_length'),
+        ]
+        if parse_values:
+            exprs.append(
+                numerical_strings.list.eval(
+                    pl.element().str.replace_all(',', '', literal=True).cast(pl.Float64, strict=False)
+                ).alias(f'{column}_numerical_values')
+            )
+        return exprs
@@ -5,14 +5,17 @@
 from __future__ import annotations
 
 # import statistics
+import numpy as np
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal
 # if TYPE_CHECKING:
 
 
 class ReduceSimilaritiesMethods:
     """
     多个similarities降低为一个similarity的方法。
+
+    对于相似度矩阵，使用reduce_similarity_matrix，沿指定的轴一次向量化计算。
     """
     @staticmethod
     def calculate_mean_similarity(
@@ -26,3 +29,109 @@ class ReduceSimilaritiesMethods:
     ) -> float:
         return max(similarities)
 
+    # ====矩阵方法。====
+    @staticmethod
+    def reduce_similarity_matrix(
+        similarity_matrix: np.ndarray | list[list[float]],
+        reduce_method: Literal['mean', 'max', 'top_k_mean', 'softmax', 'quantile'],
+        axis: int = 1,
+        top_k: int = 5,
+        temperature: float = 0.1,
+        quantile: float = 0.9,
+        use_float32: bool = False,
+    ) -> np.ndarray:
+        """
+        沿指定的轴将相似度矩阵降低为一组similarity。
+
+        一般输入为LangchainEmbeddingCalculator.calculate_cosine_similarities的结果，形状为(query数量, 文本数量)。
+
+        Args:
+            similarity_matrix (Union[np.ndarray, list[list[float]]]): 相似度矩阵。
+            reduce_method (str): 降低的方法。
+                - mean: 平均值。
+                - max: 最大值。
+                - top_k_mean: 最大的top_k个值的平均值。
+                - softmax: 以softmax(similarity / temperature)为权重的加权平均。
+                - quantile: 分位数。
+            axis (int): 降低的轴。
+            top_k (int): top_k_mean使用的数量，超过该轴的长度时使用全部。
+            temperature (float): softmax使用的温度，越小越接近max。
+            quantile (float): quantile使用的分位数，范围为[0, 1]。
+            use_float32 (bool): 是否使用float32计算，内存占用减半。
+
+        Returns:
+            np.ndarray: 降低后的similarities。
+        """
+        similarity_matrix = ReduceSimilaritiesMethods.to_similarity_array(
+            similarity_matrix=similarity_matrix,
+            use_float32=use_float32,
+        )
+        if reduce_method == 'mean':
+            return similarity_matrix.mean(axis=axis)
+        elif reduce_method == 'max':
+            return similarity_matrix.max(axis=axis)
+        elif reduce_method == 'top_k_mean':
+            return ReduceSimilaritiesMethods.calculate_top_k_mean_similarities(
+                similarity_matrix=similarity_matrix,
+                top_k=top_k,
+                axis=axis,
+            )
+        elif reduce_method == 'softmax':
+            return ReduceSimilaritiesMethods.calculate_softmax_weighted_similarities(
+                similarity_matrix=similarity_matrix,
+                temperature=temperature,
+                axis=axis,
+            )
+        elif reduce_method == 'quantile':
+            return np.quantile(similarity_matrix, quantile, axis=axis).astype(similarity_matrix.dtype, copy=False)
+        raise ValueError(f"Unsupported reduce_method: {reduce_method}")
+
+    @staticmethod
+    def calculate_top_k_mean_similarities(
+        similarity_matrix: np.ndarray,
+        top_k: int,
+        axis: int = 1,
+    ) -> np.ndarray:
+        """
+        沿指定的轴计算最大的top_k个值的平均值。
+
+        使用np.partition，不对整个轴进行排序。
+        """
+        if top_k < 1:
+            raise ValueError(f"top_k must be at least 1, got {top_k}")
+        length = similarity_matrix.shape[axis]
+        top_k = min(top_k, length)
+        top_k_similarities = np.partition(similarity_matrix, length - top_k, axis=axis)
+        top_k_similarities = np.take(top_k_similarities, range(length - top_k, length), axis=axis)
+        return top_k_similarities.mean(axis=axis)
+
+    @staticmethod
+    def calculate_softmax_weighted_similarities(
+        similarity_matrix: np.ndarray,
+        temperature: float,
+        axis: int = 1,
+    ) -> np.ndarray:
+        """
+        沿指定的轴计算以softmax(similarity / temperature)为权重的加权平均。
+        """
+        logits = similarity_matrix / temperature
+        # 减去最大值，避免溢出。
+        weights = np.exp(logits - logits.max(axis=axis, keepdims=True))
+        weights /= weights.sum(axis=axis, keepdims=True)
+        return (weights * similarity_matrix).sum(axis=axis)
+
+    # ====工具方法。====
+    @staticmethod
+    def to_similarity_array(
+        similarity_matrix: np.ndarray | list[list[float]],
+        use_float32: bool = False,
+    ) -> np.ndarray:
+        """
+        转换为浮点数的np.ndarray，已经满足类型时不进行复制。
+        """
+        if use_float32:
+            return np.asarray(similarity_matrix, dtype=np.float32)
+        similarity_matrix = np.asarray(similarity_matrix)
+        if not np.issubdtype(similarity_matrix.dtype, np.floating):
+            similarity_matrix = similarity_matrix.astype(np.float64)
+        return similarity_matrix
@@ -1,33 +1,296 @@
 """
 基于text-rank的分析方法。
+
+对于大量文本，使用TextRankExtractor:
+    - pipeline只构建一次，以nlp.pipe分批处理。
+    - 可以使用多个进程，每个进程中只加载一次pipeline，只返回结构化的结果，不传递Doc。
+    - 结果为records或polars的DataFrame，可以通过merge_corpus_keyphrases合并为语料级别的排序。
 """
 
 from __future__ import annotations
 
-import spacy
-import pytextrank
+from text_analysis.text_preprocessing.spacy_pipeline_registry import load_spacy_pipeline
+
+import itertools
+import polars as pl
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 from typing import TYPE_CHECKING
-# if TYPE_CHECKING:
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from spacy.language import Language
+    from spacy.tokens import Doc
 
 
 def get_text_rank_result(
     text: str,
     text_rank_config: dict,
     keywords_number: int,
+    model_name: str = 'en_core_web_sm',
 ):
-    nlp = spacy.load('en_core_web_sm')
     # nlp = spacy.load('en_core_web_lg')
-    nlp.add_pipe(
-        'textrank',
-        config=text_rank_config,
+    extractor = TextRankExtractor(
+        model_name=model_name,
+        text_rank_config=text_rank_config,
+        max_length=1000000 * 200,  # 使用200G内存
     )
-    nlp.max_length = 1000000 * 200  # 使用200G内存
-    doc = nlp(text)
-    for phrase in doc._.phrases[:keywords_number]:
-        # phrase.text
-        # phrase.rank
-        # phrase.count
-        # phrase.chunks
-        print(f"Text: {phrase.text}. \t Rank: {phrase.rank}. \t Count: {phrase.count}.")
+    for phrase in extractor.extract_keyphrases(text, keywords_number):
+        print(f"Text: {phrase['text']}. \t Rank: {phrase['rank']}. \t Count: {phrase['count']}.")
+
+
+class TextRankExtractor:
+    """
+    可以重复使用的text-rank关键短语提取器。
+
+    使用方法:
+    ```python
+    extractor = TextRankExtractor('en_core_web_sm')
+    df = extractor.extract_keyphrases_frame(texts, keywords_number=10, num_workers=8)
+    corpus_df = TextRankExtractor.merge_corpus_keyphrases(df)
+    ```
+    """
+    def __init__(
+        self,
+        model_name: str = 'en_core_web_sm',
+        text_rank_config: dict | None = None,
+        max_length: int | None = None,
+    ):
+        """
+        Args:
+            model_name (str): 使用的模型，需要包含parser以计算noun_chunks。
+            text_rank_config (Optional[dict]): textrank组件的配置，需要可以json序列化。
+            max_length (Optional[int]): 设置nlp.max_length，None为使用模型的默认设置。
+        """
+        self.model_name = model_name
+        self.text_rank_config = text_rank_config or {}
+        self.max_length = max_length
+
+    @property
+    def nlp(self) -> Language:
+        # 导入pytextrank以注册textrank组件。
+        import pytextrank  # noqa: F401
+        return load_spacy_pipeline(
+            self.model_name,
+            add_pipes=(('textrank', self.text_rank_config),),
+            max_length=self.max_length,
+        )
+
+    # ====主要方法。====
+    def extract_keyphrases(
+        self,
+        text: str,
+        keywords_number: int,
+    ) -> list[dict]:
+        """
+        提取一个文本的关键短语。
+
+        Returns:
+            list[dict]: 按照rank从高到低的关键短语，见get_keyphrase_records。
+        """
+        return TextRankExtractor.get_keyphrase_records(
+            doc=self.nlp(text),
+            keywords_number=keywords_number,
+        )
+
+    # ====主要方法。====
+    def iter_keyphrases(
+        self,
+        texts: Iterable[str],
+        keywords_number: int,
+        batch_size: int = 64,
+    ) -> Iterator[list[dict]]:
+        """
+        在当前进程中以nlp.pipe分批处理，按照输入顺序逐个产出每个文本的关键短语。
+        """
+        for doc in self.nlp.pipe(texts, batch_size=batch_size):
+            yield TextRankExtractor.get_keyphrase_records(
+                doc=doc,
+                keywords_number=keywords_number,
+            )
+
+    # ====主要方法。====
+    def extract_keyphrases_records(
+        self,
+        texts: Iterable[str],
+        keywords_number: int,
+        num_workers: int = 1,
+        chunk_size: int = 1000,
+        batch_size: int = 64,
+    ) -> list[dict]:
+        """
+        提取一组文本的关键短语，可以使用多个进程。
+
+        texts可以为生成器。同时进行的任务数量不超过2倍的进程数量，结果按照输入顺序。
+
+        Args:
+            texts (Iterable[str]): 一组文本。
+            keywords_number (int): 每个文本保留的关键短语数量。
+            num_workers (int): 进程数量，为1时在当前进程中计算。
+            chunk_size (int): 每个任务处理的文本数量。
+            batch_size (int): nlp.pipe每批处理的文本数量。
+
+        Returns:
+            list[dict]: 每个关键短语一条记录，包含doc_index以及get_keyphrase_records中的字段。
+        """
+        texts = iter(texts)
+        chunks = iter(lambda: list(itertools.islice(texts, chunk_size)), [])
+        records = []
+        doc_index = 0
+        if num_workers > 1:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                # 按照提交顺序取结果，保持输入顺序。
+                futures = deque()
+                for chunk in chunks:
+                    futures.append(executor.submit(
+                        extract_keyphrases_in_worker,
+                        self.model_name, self.text_rank_config, self.max_length,
+                        chunk, keywords_number, batch_size,
+                    ))
+                    if len(futures) >= 2 * num_workers:
+                        doc_index = TextRankExtractor.add_doc_records(
+                            records, futures.popleft().result(), doc_index,
+                        )
+                while futures:
+                    doc_index = TextRankExtractor.add_doc_records(
+                        records, futures.popleft().result(), doc_index,
+                    )
+        else:
+            for chunk in chunks:
+                doc_index = TextRankExtractor.add_doc_records(
+                    records, list(self.iter_keyphrases(chunk, keywords_number, batch_size)), doc_index,
+                )
+        return records
+
+    # ====主要方法。====
+    def extract_keyphrases_frame(
+        self,
+        texts: Iterable[str],
+        keywords_number: int,
+        num_workers: int = 1,
+        chunk_size: int = 1000,
+        batch_size: int = 64,
+    ) -> pl.DataFrame:
+        """
+        以polars的DataFrame返回extract_keyphrases_records的结果。
 
+        Returns:
+            pl.DataFrame: 列为doc_index, phrase_index, text, rank, count, chunks。
+                chunks为list[struct{start_char, end_char}]。
+        """
+        records = self.extract_keyphrases_records(
+            texts=texts,
+            keywords_number=keywords_number,
+            num_workers=num_workers,
+            chunk_size=chunk_size,
+            batch_size=batch_size,
+        )
+        return pl.DataFrame(
+            records,
+            schema={
+                'doc_index': pl.Int64,
+                'phrase_index': pl.Int64,
+                'text': pl.String,
+                'rank': pl.Float64,
+                'count': pl.Int64,
+                'chunks': pl.List(pl.Struct({'start_char': pl.Int64, 'end_char': pl.Int64})),
+            },
+        )
+
+    # ====暴露方法。====
+    @staticmethod
+    def merge_corpus_keyphrases(
+        keyphrases_df: pl.DataFrame,
+        top_k: int | None = None,
+    ) -> pl.DataFrame:
+        """
+        将每个文本的关键短语合并为语料级别的排序。
+
+        以小写的短语文本合并，按照rank之和降序排列，同时考虑短语的重要性和出现的文本数量。
+
+        Args:
+            keyphrases_df (pl.DataFrame): extract_keyphrases_frame的结果。
+            top_k (Optional[int]): 保留的数量，None为全部。
+
+        Returns:
+            pl.DataFrame: 列为phrase, rank_sum, rank_mean, rank_max, doc_count, count。
+        """
+        corpus_df = (
+            keyphrases_df
+            .group_by(pl.col('text').str.to_lowercase().alias('phrase'))
+            .agg(
+                pl.col('rank').sum().alias('rank_sum'),
+                pl.col('rank').mean().alias('rank_mean'),
+                pl.col('rank').max().alias('rank_max'),
+                pl.col('doc_index').n_unique().alias('doc_count'),
+                pl.col('count').sum().alias('count'),
+            )
+            .sort(['rank_sum', 'phrase'], descending=[True, False])
+        )
+        if top_k is not None:
+            corpus_df = corpus_df.head(top_k)
+        return corpus_df
+
+    # ====工具方法。====
+    @staticmethod
+    def get_keyphrase_records(
+        doc: Doc,
+        keywords_number: int,
+    ) -> list[dict]:
+        """
+        将doc._.phrases转换为可以序列化的记录。
+
+        Returns:
+            list[dict]: 每条记录包含phrase_index, text, rank, count, chunks，
+                chunks为每次出现的字符位置[{'start_char', 'end_char'}]。
+        """
+        return [
+            {
+                'phrase_index': phrase_index,
+                'text': phrase.text,
+                'rank': phrase.rank,
+                'count': phrase.count,
+                'chunks': [
+                    {'start_char': chunk.start_char, 'end_char': chunk.end_char}
+                    for chunk in phrase.chunks
+                ],
+            }
+            for phrase_index, phrase in enumerate(doc._.phrases[:keywords_number])
+        ]
+
+    # ====工具方法。====
+    @staticmethod
+    def add_doc_records(
+        records: list[dict],
+        docs_records: list[list[dict]],
+        doc_index: int,
+    ) -> int:
+        """
+        为一个任务中每个文本的记录添加doc_index，并加入records。
+
+        Returns:
+            int: 下一个文本的doc_index。
+        """
+        for doc_records in docs_records:
+            records.extend({'doc_index': doc_index, **record} for record in doc_records)
+            doc_index += 1
+        return doc_index
+
+
+def extract_keyphrases_in_worker(
+    model_name: str,
+    text_rank_config: dict,
+    max_length: int | None,
+    texts: list[str],
+    keywords_number: int,
+    batch_size: int,
+) -> list[list[dict]]:
+    """
+    在子进程中提取一组文本的关键短语，pipeline在每个进程中只加载一次。
+    """
+    extractor = TextRankExtractor(
+        model_name=model_name,
+        text_rank_config=text_rank_config,
+        max_length=max_length,
+    )
+    return list(extractor.iter_keyphrases(texts, keywords_number, batch_size))
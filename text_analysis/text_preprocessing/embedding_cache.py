@@ -0,0 +1,157 @@
+"""
+embeddings的本地持久化缓存。
+
+重复运行时，相同的文本不需要再次调用embedding-model。
+
+实现:
+    - 基于sqlite，不需要额外依赖，单个文件即可保存和复制。
+    - 以(模型名称, 文本的sha256)为键，embedding以float32的bytes保存。
+    - 超过数量上限时，按照最近访问时间淘汰(LRU)。
+"""
+
+from __future__ import annotations
+
+import time
+import hashlib
+import sqlite3
+import numpy as np
+from pathlib import Path
+
+from typing import TYPE_CHECKING
+# if TYPE_CHECKING:
+
+
+class EmbeddingCache:
+    """
+    基于sqlite的embeddings缓存。
+
+    一个数据库文件可以保存多个模型的结果，以model_name区分。
+    """
+    def __init__(
+        self,
+        path_to_db: str | Path,
+        model_name: str,
+        max_entries: int | None = None,
+    ):
+        """
+        Args:
+            path_to_db (Union[str, Path]): sqlite数据库文件路径，会自动处理中间路径的文件夹。
+            model_name (str): 模型的唯一标识。不同模型或不同配置的embeddings不能混用，需要使用不同的名称。
+            max_entries (Optional[int]): 这个模型缓存的数量上限，None为不限制。
+        """
+        self.path_to_db = Path(path_to_db)
+        self.path_to_db.parent.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(self.path_to_db)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings ('
+            'model_name TEXT NOT NULL, '
+            'text_hash TEXT NOT NULL, '
+            'embedding BLOB NOT NULL, '
+            'last_access INTEGER NOT NULL, '
+            'PRIMARY KEY (model_name, text_hash))'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (model_name, last_access)'
+        )
+        self.connection.commit()
+
+    def __enter__(self) -> EmbeddingCache:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    # ====主要方法。====
+    def get_embeddings(
+        self,
+        texts: list[str],
+    ) -> dict[str, np.ndarray]:
+        """
+        查询一组文本的缓存，并更新命中的访问时间。
+
+        Args:
+            texts (list[str]): 一组文本。
+
+        Returns:
+            dict[str, np.ndarray]: 命中的文本到float32的embedding。
+        """
+        text_hashes = {EmbeddingCache.hash_text(text): text for text in texts}
+        embeddings = {}
+        hit_hashes = []
+        hashes = list(text_hashes)
+        # sqlite对于参数数量有限制，分批查询。
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            rows = self.connection.execute(
+                f'SELECT text_hash, embedding FROM embeddings '
+                f'WHERE model_name = ? AND text_hash IN ({",".join("?" * len(batch))})',
+                [self.model_name, *batch],
+            ).fetchall()
+            for text_hash, embedding in rows:
+                embeddings[text_hashes[text_hash]] = np.frombuffer(embedding, dtype=np.float32)
+                hit_hashes.append(text_hash)
+        if hit_hashes:
+            now = time.time_ns()
+            self.connection.executemany(
+                'UPDATE embeddings SET last_access = ? WHERE model_name = ? AND text_hash = ?',
+                [(now, self.model_name, text_hash) for text_hash in hit_hashes],
+            )
+            self.connection.commit()
+        self.hits += sum(1 for text in texts if text in embeddings)
+        self.misses += sum(1 for text in texts if text not in embeddings)
+        return embeddings
+
+    # ====主要方法。====
+    def put_embeddings(
+        self,
+        texts: list[str],
+        embeddings: list[list[float]] | np.ndarray,
+    ) -> None:
+        """
+        保存一组文本的embeddings，超过数量上限时淘汰最久未访问的缓存。
+
+        Args:
+            texts (list[str]): 一组文本。
+            embeddings (Union[list[list[float]], np.ndarray]): 按照输入顺序的embeddings。
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        now = time.time_ns()
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO embeddings (model_name, text_hash, embedding, last_access) VALUES (?, ?, ?, ?)',
+            [
+                (self.model_name, EmbeddingCache.hash_text(text), embedding.tobytes(), now)
+                for text, embedding in zip(texts, embeddings)
+            ],
+        )
+        if self.max_entries is not None:
+            self.connection.execute(
+                'DELETE FROM embeddings WHERE model_name = ? AND text_hash IN ('
+                'SELECT text_hash FROM embeddings WHERE model_name = ? '
+                'ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                (self.model_name, self.model_name, self.max_entries),
+            )
+        self.connection.commit()
+
+    def count_entries(self) -> int:
+        """
+        这个模型当前缓存的数量。
+        """
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM embeddings WHERE model_name = ?',
+            (self.model_name,),
+        ).fetchone()[0]
+
+    # ====工具方法。====
+    @staticmethod
+    def hash_text(
+        text: str,
+    ) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
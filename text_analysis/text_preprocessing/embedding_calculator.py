@@ -8,17 +8,22 @@
 
 可以进行的改进:
     - HuggingfaceEmbeddings: 支持的模型更多，并且可以直接计算相似度。
+    - 缓存: 已经可以通过EmbeddingCache在本地持久化，重复运行时只计算新的文本。
     - vector-store: langchain中提供了vector-store，可以高效计算和查询。
+        本地的近似最近邻查询已经可以通过HnswEmbeddingIndex进行。
 """
 
 from __future__ import annotations
 
+import random
+import asyncio
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from langchain_core.embeddings import Embeddings
+    from .embedding_cache import EmbeddingCache
 
 
 class LangchainEmbeddingCalculator:
@@ -39,19 +44,24 @@ class LangchainEmbeddingCalculator:
     # ====暴露方法。====
     @staticmethod
     def batch_calculate_multi_query_weighted_scores(
-        query_embeddings: list[list[float]],
-        text_embeddings: list[list[float]],
+        query_embeddings: list[list[float]] | np.ndarray,
+        text_embeddings: list[list[float]] | np.ndarray,
         query_weights: list[float],
+        block_size: int = 65536,
     ) -> list[float]:
         """
         给予多个query，根据权重求和各个文本对于一组查询的相似度。
 
         为了更好的可解释性，可传入仅一个query。
 
+        cosine相似度的加权和等于文本的单位向量与query单位向量加权和的内积，
+        因此先合并query，再按文本分块计算，不构建完整的相似度矩阵。
+
         Args:
-            query_embeddings: (list[list[float]]): 一组query的embedding。
-            text_embeddings: (list[list[float]]): 一组文本的embedding。
+            query_embeddings: (Union[list[list[float]], np.ndarray]): 一组query的embedding。
+            text_embeddings: (Union[list[list[float]], np.ndarray]): 一组文本的embedding。
             query_weights: (list[float]): 各query按照输入顺序的权重。
+            block_size (int): 每次计算的文本数量，决定峰值内存。
 
         Returns:
             list[float]: 每个文本对于一组query的相似度。
@@ -59,14 +69,78 @@ class LangchainEmbeddingCalculator:
         query_weights = np.array(query_weights)
         # 归一化。
         query_weights = query_weights / np.sum(query_weights)
-        # 批量计算原始权重。
-        similarity_matrix = LangchainEmbeddingCalculator.calculate_cosine_similarities(
-            query_embeddings=query_embeddings,
-            text_embeddings=text_embeddings,
+        # 合并为一个加权的query向量。
+        normalized_query_embeddings = LangchainEmbeddingCalculator.normalize_embeddings(
+            embeddings=query_embeddings,
+            dtype=np.float64,
         )
-        weight_matrix = similarity_matrix * query_weights[:, np.newaxis]
-        weight_average_similarity_by_col = np.sum(weight_matrix, axis=0)
-        return weight_average_similarity_by_col.tolist()
+        weighted_query_embedding = query_weights @ normalized_query_embeddings
+        # 按文本分块计算。
+        scores = np.empty(len(text_embeddings), dtype=np.float64)
+        for start in range(0, len(text_embeddings), block_size):
+            text_block = LangchainEmbeddingCalculator.normalize_embeddings(
+                embeddings=text_embeddings[start:start + block_size],
+                dtype=np.float64,
+            )
+            scores[start:start + len(text_block)] = text_block @ weighted_query_embedding
+        return scores.tolist()
+
+    # ====暴露方法。====
+    @staticmethod
+    def search_top_k_similarities(
+        query_embeddings: list[list[float]] | np.ndarray,
+        text_embeddings: list[list[float]] | np.ndarray,
+        top_k: int,
+        block_size: int = 65536,
+        dtype: type[np.floating] = np.float32,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        对每个query查找cosine相似度最高的top_k个文本。
+
+        query只归一化一次，文本按照block_size分块归一化，使用矩阵乘法计算每一块的相似度，
+        每一块仅通过argpartition保留每个query的top_k，峰值内存由(query数量, block_size)决定，
+        不构建完整的(query数量, 文本数量)的相似度矩阵。
+
+        Args:
+            query_embeddings: (Union[list[list[float]], np.ndarray]): 一组query的embedding。
+            text_embeddings: (Union[list[list[float]], np.ndarray]): 一组文本的embedding。
+            top_k (int): 每个query保留的文本数量，超过文本数量时为全部。
+            block_size (int): 每次计算的文本数量。
+            dtype (type[np.floating]): 计算使用的精度，默认float32。
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: 形状均为(query数量, top_k)，按相似度从高到低排序的文本序号和相似度。
+        """
+        normalized_query_embeddings = LangchainEmbeddingCalculator.normalize_embeddings(
+            embeddings=query_embeddings,
+            dtype=dtype,
+        )
+        num_queries = normalized_query_embeddings.shape[0]
+        top_k = min(top_k, len(text_embeddings))
+        best_indices = np.empty((num_queries, 0), dtype=np.int64)
+        best_scores = np.empty((num_queries, 0), dtype=dtype)
+        for start in range(0, len(text_embeddings), block_size):
+            text_block = LangchainEmbeddingCalculator.normalize_embeddings(
+                embeddings=text_embeddings[start:start + block_size],
+                dtype=dtype,
+            )
+            block_scores = normalized_query_embeddings @ text_block.T
+            # 先在块内保留top_k，再与已有结果合并。
+            if block_scores.shape[1] > top_k:
+                block_indices = np.argpartition(-block_scores, top_k - 1, axis=1)[:, :top_k]
+                block_scores = np.take_along_axis(block_scores, block_indices, axis=1)
+            else:
+                block_indices = np.broadcast_to(np.arange(block_scores.shape[1]), block_scores.shape)
+            candidate_indices = np.concatenate([best_indices, block_indices + start], axis=1)
+            candidate_scores = np.concatenate([best_scores, block_scores], axis=1)
+            if candidate_scores.shape[1] > top_k:
+                keep = np.argpartition(-candidate_scores, top_k - 1, axis=1)[:, :top_k]
+                candidate_indices = np.take_along_axis(candidate_indices, keep, axis=1)
+                candidate_scores = np.take_along_axis(candidate_scores, keep, axis=1)
+            best_indices, best_scores = candidate_indices, candidate_scores
+        # 按相似度从高到低排序。
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        return np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
 
     # ====工具方法。仅封装cosine_similarity方法。====
     @staticmethod
@@ -92,26 +166,151 @@ class LangchainEmbeddingCalculator:
         )
         return similarity
 
+    # ====工具方法。====
+    @staticmethod
+    def normalize_embeddings(
+        embeddings: list[list[float]] | np.ndarray,
+        dtype: type[np.floating] = np.float32,
+    ) -> np.ndarray:
+        """
+        将embeddings归一化为单位向量，归一化后的内积即为cosine相似度。
+
+        与sklearn的cosine_similarity一致，零向量保持为零向量。
+
+        Args:
+            embeddings (Union[list[list[float]], np.ndarray]): 一组embedding。
+            dtype (type[np.floating]): 结果的精度。
+
+        Returns:
+            np.ndarray: 归一化后的embeddings。
+        """
+        embeddings = np.array(embeddings, dtype=dtype, ndmin=2)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        embeddings /= norms
+        return embeddings
+
     # ====工具方法。仅封装langchain_core.Embeddings方法。====
     @staticmethod
     def calculate_embeddings(
         embedding_model: Embeddings,
         texts: list[str],
+        cache: EmbeddingCache | None = None,
     ) -> list[list[float]]:
         """
         将一组文本编码为embeddings。
 
         这里使用的是langchain中提供的embedding_model。
+        指定cache时，只将未缓存的文本(去重后)交给embedding_model，结果按照原始顺序合并，
+        并且所有结果均为float32精度，与是否命中缓存无关。
 
         Args:
             embedding_model (Embeddings): langchain中符合Embeddings定义的实例。
             texts (list[str]): 一组文本。
+            cache (Optional[EmbeddingCache]): 本地缓存，其model_name需要与embedding_model对应。
 
         Returns:
             list[list[float]]: 编码后的embeddings。
         """
-        embeddings = embedding_model.embed_documents(
+        if cache is None:
+            embeddings = embedding_model.embed_documents(
+                texts=texts,
+            )
+            return embeddings
+        cached_embeddings = cache.get_embeddings(texts)
+        missed_texts = list(dict.fromkeys(text for text in texts if text not in cached_embeddings))
+        if missed_texts:
+            missed_embeddings = np.asarray(
+                embedding_model.embed_documents(texts=missed_texts),
+                dtype=np.float32,
+            )
+            cache.put_embeddings(missed_texts, missed_embeddings)
+            cached_embeddings.update(zip(missed_texts, missed_embeddings))
+        return [cached_embeddings[text].tolist() for text in texts]
+
+    # ====工具方法。仅封装langchain_core.Embeddings方法。====
+    @staticmethod
+    def calculate_embeddings_concurrently(
+        embedding_model: Embeddings,
+        texts: list[str],
+        batch_size: int = 64,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        initial_backoff: float = 1.0,
+        cache: EmbeddingCache | None = None,
+    ) -> list[list[float]]:
+        """
+        acalculate_embeddings的同步入口，在没有运行中的事件循环时使用。
+
+        参数与acalculate_embeddings相同。
+        """
+        return asyncio.run(LangchainEmbeddingCalculator.acalculate_embeddings(
+            embedding_model=embedding_model,
             texts=texts,
-        )
-        return embeddings
+            batch_size=batch_size,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            initial_backoff=initial_backoff,
+            cache=cache,
+        ))
+
+    # ====工具方法。仅封装langchain_core.Embeddings方法。====
+    @staticmethod
+    async def acalculate_embeddings(
+        embedding_model: Embeddings,
+        texts: list[str],
+        batch_size: int = 64,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        initial_backoff: float = 1.0,
+        cache: EmbeddingCache | None = None,
+    ) -> list[list[float]]:
+        """
+        将一组文本分批并发编码为embeddings。
+
+        基于langchain中Embeddings的aembed_documents，使用信号量限制同时进行的请求数量。
+        请求失败时(例如服务端限流)，以指数退避并加入随机抖动后重试。结果按照原始顺序合并。
+
+        Args:
+            embedding_model (Embeddings): langchain中符合Embeddings定义的实例。
+            texts (list[str]): 一组文本。
+            batch_size (int): 每个请求包含的文本数量。
+            max_concurrency (int): 同时进行的请求数量上限。
+            max_retries (int): 每个请求失败后的最大重试次数，超过后抛出最后一次的异常。
+            initial_backoff (float): 第一次重试前等待的秒数，之后每次翻倍。
+            cache (Optional[EmbeddingCache]): 本地缓存，只对未缓存的文本发送请求。
+
+        Returns:
+            list[list[float]]: 编码后的embeddings。
+        """
+        if cache is not None:
+            cached_embeddings = cache.get_embeddings(texts)
+            missed_texts = list(dict.fromkeys(text for text in texts if text not in cached_embeddings))
+        else:
+            missed_texts = texts
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def embed_batch(batch: list[str]) -> list[list[float]]:
+            async with semaphore:
+                for attempt in range(max_retries + 1):
+                    try:
+                        return await embedding_model.aembed_documents(batch)
+                    except Exception:
+                        if attempt == max_retries:
+                            raise
+                        backoff = initial_backoff * 2 ** attempt
+                        await asyncio.sleep(backoff + random.uniform(0, backoff))
 
+        # gather按照输入顺序返回结果。
+        batches_embeddings = await asyncio.gather(*(
+            embed_batch(missed_texts[start:start + batch_size])
+            for start in range(0, len(missed_texts), batch_size)
+        ))
+        embeddings = [embedding for batch_embeddings in batches_embeddings for embedding in batch_embeddings]
+        if cache is None:
+            return embeddings
+        if missed_texts:
+            missed_embeddings = np.asarray(embeddings, dtype=np.float32)
+            cache.put_embeddings(missed_texts, missed_embeddings)
+            cached_embeddings.update(zip(missed_texts, missed_embeddings))
+        return [cached_embeddings[text].tolist() for text in texts]
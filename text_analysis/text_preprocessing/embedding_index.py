@@ -0,0 +1,213 @@
+"""
+基于HNSW图的embeddings近似最近邻索引。
+
+LangchainEmbeddingCalculator中的相似度计算为精确的暴力计算，复杂度与文本数量线性相关。
+对于大规模语料，构建HNSW索引后，查询为亚线性复杂度。
+
+实现:
+    - 基于hnswlib，支持增量添加、持久化和批量查询。
+    - 相似度与LangchainEmbeddingCalculator.search_top_k_similarities一致，为cosine相似度。
+    - calculate_recall_at_k: 以精确计算为基准，评估索引的recall@k，用于调整ef_search等参数。
+
+需要:
+```shell
+pip install hnswlib
+```
+"""
+
+from __future__ import annotations
+
+import json
+import hnswlib
+import numpy as np
+from pathlib import Path
+
+from .embedding_calculator import LangchainEmbeddingCalculator
+
+from typing import TYPE_CHECKING, Literal
+# if TYPE_CHECKING:
+
+
+class HnswEmbeddingIndex:
+    """
+    基于hnswlib的embeddings索引。
+
+    未指定ids时，按照添加顺序以0, 1, 2, ...编号，与calculate_embeddings的输出顺序对应。
+    """
+    def __init__(
+        self,
+        dim: int,
+        space: Literal['cosine', 'ip', 'l2'] = 'cosine',
+        max_elements: int = 100000,
+        ef_construction: int = 200,
+        M: int = 16,
+        ef_search: int = 64,
+        num_threads: int = -1,
+    ):
+        """
+        Args:
+            dim (int): embeddings的维度。
+            space (str): 距离类型。cosine时查询结果的相似度即为cosine相似度。
+            max_elements (int): 初始容量，添加时超过容量会自动扩容。
+            ef_construction (int): 构建时的候选数量，越大索引质量越高，构建越慢。
+            M (int): 每个节点的连接数量，越大召回越高，内存占用越大。
+            ef_search (int): 查询时的候选数量，越大召回越高，查询越慢。
+            num_threads (int): 添加和查询使用的线程数量，-1为全部。
+        """
+        self.dim = dim
+        self.space = space
+        self.ef_construction = ef_construction
+        self.M = M
+        self.ef_search = ef_search
+        self.num_threads = num_threads
+        self.index = hnswlib.Index(space=space, dim=dim)
+        self.index.init_index(max_elements=max_elements, ef_construction=ef_construction, M=M)
+        self.index.set_ef(ef_search)
+
+    def __len__(self) -> int:
+        return self.index.get_current_count()
+
+    # ====主要方法。====
+    def add_embeddings(
+        self,
+        embeddings: list[list[float]] | np.ndarray,
+        ids: list[int] | np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        增量添加embeddings。
+
+        Args:
+            embeddings (Union[list[list[float]], np.ndarray]): 一组embedding。
+            ids (Optional[Union[list[int], np.ndarray]]): 每个embedding的编号，None为接着已有数量继续编号。
+
+        Returns:
+            np.ndarray: 添加的编号。
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if ids is None:
+            ids = np.arange(len(self), len(self) + len(embeddings))
+        ids = np.asarray(ids, dtype=np.int64)
+        # 容量不足时至少扩容一倍，避免频繁扩容。
+        required_elements = len(self) + len(embeddings)
+        if required_elements > self.index.get_max_elements():
+            self.index.resize_index(max(required_elements, 2 * self.index.get_max_elements()))
+        self.index.add_items(embeddings, ids, num_threads=self.num_threads)
+        return ids
+
+    # ====主要方法。====
+    def search(
+        self,
+        query_embeddings: list[list[float]] | np.ndarray,
+        top_k: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        批量查询每个query最相似的top_k个embeddings。
+
+        Args:
+            query_embeddings (Union[list[list[float]], np.ndarray]): 一组query的embedding。
+            top_k (int): 每个query返回的数量，超过索引中的数量时为全部。
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: 形状均为(query数量, top_k)，按相似度从高到低排序的编号和相似度。
+                cosine和ip时为相似度，l2时为负的平方距离。
+        """
+        query_embeddings = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+        top_k = min(top_k, len(self))
+        # hnswlib要求ef不小于k。
+        self.index.set_ef(max(self.ef_search, top_k))
+        ids, distances = self.index.knn_query(query_embeddings, k=top_k, num_threads=self.num_threads)
+        self.index.set_ef(self.ef_search)
+        scores = -distances if self.space == 'l2' else 1 - distances
+        return ids.astype(np.int64), scores
+
+    # ====主要方法。====
+    def calculate_recall_at_k(
+        self,
+        query_embeddings: list[list[float]] | np.ndarray,
+        text_embeddings: list[list[float]] | np.ndarray,
+        top_k: int,
+    ) -> float:
+        """
+        以精确的cosine相似度计算为基准，计算索引的recall@k。
+
+        text_embeddings需要与未指定ids时添加到索引中的embeddings相同且顺序一致。
+
+        Args:
+            query_embeddings (Union[list[list[float]], np.ndarray]): 一组用于评估的query的embedding。
+            text_embeddings (Union[list[list[float]], np.ndarray]): 索引中的全部embeddings。
+            top_k (int): 评估的k。
+
+        Returns:
+            float: 近似结果中包含精确top_k结果的比例。
+        """
+        exact_ids, _ = LangchainEmbeddingCalculator.search_top_k_similarities(
+            query_embeddings=query_embeddings,
+            text_embeddings=text_embeddings,
+            top_k=top_k,
+        )
+        approximate_ids, _ = self.search(
+            query_embeddings=query_embeddings,
+            top_k=top_k,
+        )
+        hits = sum(
+            len(np.intersect1d(exact, approximate))
+            for exact, approximate in zip(exact_ids, approximate_ids)
+        )
+        return hits / exact_ids.size if exact_ids.size else 1.0
+
+    # ====持久化方法。====
+    def save(
+        self,
+        index_dir: str | Path,
+    ) -> None:
+        """
+        保存索引和参数。
+
+        Args:
+            index_dir (Union[str, Path]): 保存的文件夹，会自动处理中间路径的文件夹。
+        """
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        self.index.save_index(str(index_dir / 'index.bin'))
+        with open(index_dir / 'config.json', 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'dim': self.dim,
+                    'space': self.space,
+                    'ef_construction': self.ef_construction,
+                    'M': self.M,
+                    'ef_search': self.ef_search,
+                    'num_threads': self.num_threads,
+                },
+                file,
+            )
+
+    @staticmethod
+    def load(
+        index_dir: str | Path,
+        max_elements: int = 0,
+    ) -> HnswEmbeddingIndex:
+        """
+        加载已经保存的索引，之后可以继续添加。
+
+        Args:
+            index_dir (Union[str, Path]): 保存的文件夹。
+            max_elements (int): 加载后的容量，0为保存时的容量。
+
+        Returns:
+            HnswEmbeddingIndex: 加载的索引。
+        """
+        index_dir = Path(index_dir)
+        with open(index_dir / 'config.json', 'r', encoding='utf-8') as file:
+            config = json.load(file)
+        embedding_index = HnswEmbeddingIndex.__new__(HnswEmbeddingIndex)
+        embedding_index.dim = config['dim']
+        embedding_index.space = config['space']
+        embedding_index.ef_construction = config['ef_construction']
+        embedding_index.M = config['M']
+        embedding_index.ef_search = config['ef_search']
+        embedding_index.num_threads = config['num_threads']
+        embedding_index.index = hnswlib.Index(space=config['space'], dim=config['dim'])
+        embedding_index.index.load_index(str(index_dir / 'index.bin'), max_elements=max_elements)
+        embedding_index.index.set_ef(config['ef_search'])
+        return embedding_index
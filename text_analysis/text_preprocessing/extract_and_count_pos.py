@@ -1,24 +1,43 @@
 """
 提取词性并进行统计。
+
+对于大规模语料，使用count_corpus_pos:
+    - 按照chunk_size切分任务，每个进程以nlp.pipe处理，只返回(pos, lemma)的Counter，在主进程中合并。
+    - 每个token只遍历一次，同时统计全部指定的词性。
+    - 内存占用与词表大小相关，与文本总量无关。
 """
 
 from __future__ import annotations
 
-import spacy
+from text_analysis.text_preprocessing.spacy_pipeline_registry import (
+    load_spacy_pipeline,
+    split_long_text,
+    POS_EXCLUDED_COMPONENTS,
+)
+
+import itertools
+import polars as pl
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 from typing import TYPE_CHECKING
-# if TYPE_CHECKING:
+if TYPE_CHECKING:
+    import spacy
+    from collections.abc import Iterable
 
 
 def get_pos_result(
     text: str,
     poss: list[str],
     keywords_number: int,
+    model_name: str = 'en_core_web_lg',
 ):
-    # nlp = spacy.load('en_core_web_sm')
-    nlp = spacy.load('en_core_web_lg')
-    nlp.max_length = 1000000 * 200  # 使用200G内存
+    # 词性统计不需要parser和ner，pipeline在进程内共享。
+    nlp = load_spacy_pipeline(
+        model_name,
+        exclude=POS_EXCLUDED_COMPONENTS,
+        max_length=1000000 * 200,  # 使用200G内存
+    )
     doc = nlp(text)
     for pos in poss:
         result = extract_and_count_pos(
@@ -46,3 +65,84 @@ def extract_and_count_pos(
     lemma_counts = Counter(target_lemmas)
     return lemma_counts.most_common(n=keywords_number)
 
+
+def count_corpus_pos(
+    texts: Iterable[str],
+    poss: list[str],
+    model_name: str = 'en_core_web_lg',
+    num_workers: int = 1,
+    chunk_size: int = 1000,
+    batch_size: int = 256,
+    max_chunk_length: int = 100000,
+) -> pl.DataFrame:
+    """
+    流式统计语料中指定词性的词的还原形式。
+
+    texts可以为生成器。同时进行的任务数量不超过2倍的进程数量，不会将全部文本加载到内存中。
+
+    Args:
+        texts (Iterable[str]): 一组文本。
+        poss (list[str]): 统计的词性，例如['NOUN', 'VERB']。
+        model_name (str): 使用的模型，不加载parser和ner。
+        num_workers (int): 进程数量，为1时在当前进程中计算。
+        chunk_size (int): 每个任务处理的文本数量。
+        batch_size (int): nlp.pipe每批处理的片段数量。
+        max_chunk_length (int): 每个片段的最大字符数，超长的文本会被切分。
+
+    Returns:
+        pl.DataFrame: 列为pos, lemma, count。按照pos、count降序、lemma排序。
+    """
+    texts = iter(texts)
+    chunks = iter(lambda: list(itertools.islice(texts, chunk_size)), [])
+    pos_lemma_counts = Counter()
+    if num_workers > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = set()
+            for chunk in chunks:
+                futures.add(executor.submit(
+                    count_pos_lemmas, chunk, poss, model_name, batch_size, max_chunk_length,
+                ))
+                if len(futures) >= 2 * num_workers:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pos_lemma_counts.update(future.result())
+            for future in futures:
+                pos_lemma_counts.update(future.result())
+    else:
+        for chunk in chunks:
+            pos_lemma_counts.update(count_pos_lemmas(chunk, poss, model_name, batch_size, max_chunk_length))
+    return pl.DataFrame(
+        [(pos, lemma, count) for (pos, lemma), count in pos_lemma_counts.items()],
+        schema={'pos': pl.String, 'lemma': pl.String, 'count': pl.Int64},
+        orient='row',
+    ).sort(['pos', 'count', 'lemma'], descending=[False, True, False])
+
+
+def count_pos_lemmas(
+    texts: list[str],
+    poss: list[str],
+    model_name: str,
+    batch_size: int = 256,
+    max_chunk_length: int = 100000,
+) -> Counter:
+    """
+    统计一组文本中指定词性的词的还原形式，可以在子进程中运行，pipeline在每个进程中只加载一次。
+
+    Returns:
+        Counter: (pos, lemma)到数量。
+    """
+    nlp = load_spacy_pipeline(model_name, exclude=POS_EXCLUDED_COMPONENTS)
+    target_poss = set(poss)
+    pos_lemma_counts = Counter()
+    chunks = (
+        chunk
+        for text in texts
+        for chunk in split_long_text(text, max_chunk_length)
+    )
+    for doc in nlp.pipe(chunks, batch_size=batch_size):
+        pos_lemma_counts.update(
+            (token.pos_, token.lemma_)
+            for token in doc
+            if token.pos_ in target_poss
+        )
+    return pos_lemma_counts
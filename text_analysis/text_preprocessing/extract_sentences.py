@@ -1,14 +1,26 @@
 """
 将原始文本拆分为多个句子。
+
+对于大量文本，使用iter_sentences:
+    - 基于nlp.pipe分批处理，可以使用多进程。
+    - 默认使用空白pipeline和基于规则的sentencizer，不需要加载完整的模型。
+    - 超长的文本按照段落切分为多个片段处理，不需要调大nlp.max_length。
 """
 
 from __future__ import annotations
 
-import spacy
+from text_analysis.text_preprocessing.spacy_pipeline_registry import (
+    load_spacy_pipeline,
+    load_blank_spacy_pipeline,
+    split_long_text,
+    SENTENCE_COMPONENTS,
+)
+
 from nltk.tokenize import sent_tokenize
 
 from typing import TYPE_CHECKING
-# if TYPE_CHECKING:
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
 
 
 # def get_sentences_result(
@@ -23,11 +35,15 @@ from typing import TYPE_CHECKING
 
 def get_sentences_result(
     texts: list[str],
+    model_name: str = 'en_core_web_lg',
 ) -> list[list[str]]:
     # python -m spacy download en_core_web_lg
-    # nlp = spacy.load('en_core_web_sm')
-    nlp = spacy.load('en_core_web_lg')
-    nlp.max_length = 1000000 * 200  # 使用200G内存
+    # 分句只启用senter，pipeline在进程内共享。
+    nlp = load_spacy_pipeline(
+        model_name,
+        enable=SENTENCE_COMPONENTS,
+        max_length=1000000 * 200,  # 使用200G内存
+    )
     sentences_result = []
     for text in texts:
         doc = nlp(text)
@@ -38,11 +54,63 @@ def get_sentences_result(
 
 def extract_sentences(
     text: str,
+    model_name: str = 'en_core_web_lg',
 ) -> list[str]:
-    # nlp = spacy.load('en_core_web_sm')
-    nlp = spacy.load('en_core_web_lg')
-    nlp.max_length = 1000000 * 200  # 使用200G内存
+    nlp = load_spacy_pipeline(
+        model_name,
+        enable=SENTENCE_COMPONENTS,
+        max_length=1000000 * 200,  # 使用200G内存
+    )
     doc = nlp(text)
     sentences = [sent.text for sent in doc.sents]
     return sentences
 
+
+def iter_sentences(
+    texts: Iterable[str],
+    model_name: str | None = None,
+    batch_size: int = 256,
+    n_process: int = 1,
+    max_chunk_length: int = 100000,
+) -> Iterator[list[str]]:
+    """
+    分批拆分一组文本的句子，按照输入顺序逐个产出每个文本的句子。
+
+    texts可以为生成器，不需要将全部文本加载到内存中。
+
+    Args:
+        texts (Iterable[str]): 一组文本。
+        model_name (Optional[str]): 使用的模型，只启用senter。None为使用空白pipeline和sentencizer。
+        batch_size (int): nlp.pipe每批处理的片段数量。
+        n_process (int): nlp.pipe使用的进程数量。
+        max_chunk_length (int): 每个片段的最大字符数，超过时切分。需要小于nlp.max_length。
+
+    Yields:
+        list[str]: 一个文本的句子。
+    """
+    if model_name is None:
+        nlp = load_blank_spacy_pipeline()
+    else:
+        nlp = load_spacy_pipeline(model_name, enable=SENTENCE_COMPONENTS)
+    chunks_with_index = (
+        (chunk, text_index)
+        for text_index, text in enumerate(texts)
+        for chunk in split_long_text(text, max_chunk_length)
+    )
+    # 每个文本至少有一个片段，nlp.pipe保持顺序，编号变化时上一个文本的全部片段已经处理完。
+    current_index = None
+    sentences = []
+    for doc, text_index in nlp.pipe(
+        chunks_with_index,
+        as_tuples=True,
+        batch_size=batch_size,
+        n_process=n_process,
+    ):
+        if text_index != current_index:
+            if current_index is not None:
+                yield sentences
+            current_index = text_index
+            sentences = []
+        sentences.extend(sent.text.strip() for sent in doc.sents if sent.text.strip())
+    if current_index is not None:
+        yield sentences
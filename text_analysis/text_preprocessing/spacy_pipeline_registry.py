@@ -0,0 +1,140 @@
+"""
+进程内共享的spacy pipeline。
+
+spacy.load需要数秒和数百MB内存，不应该在每次调用时重复加载。
+这里以(模型名称, 启用的组件, 排除的组件, 添加的组件)为键缓存已经加载的pipeline，
+同一进程中相同配置的调用共享同一个pipeline。
+
+约定:
+    - 按任务只加载需要的组件，例如分句只需要senter，词性统计不需要parser和ner。
+    - 延迟导入spacy，导入text_analysis时不加载spacy。
+    - split_long_text: 将超长的文本切分为多个片段，供分句和词性统计使用。
+"""
+
+from __future__ import annotations
+
+import json
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from spacy.language import Language
+
+# 已经加载的pipeline。
+_pipelines: dict[tuple, Language] = {}
+
+# 常用任务需要的组件。
+SENTENCE_COMPONENTS = ('senter',)
+POS_EXCLUDED_COMPONENTS = ('parser', 'ner')
+
+
+def load_spacy_pipeline(
+    model_name: str,
+    enable: tuple[str, ...] | None = None,
+    exclude: tuple[str, ...] = (),
+    add_pipes: tuple[tuple[str, dict | None], ...] = (),
+    max_length: int | None = None,
+) -> Language:
+    """
+    获取缓存的spacy pipeline，第一次调用时加载。
+
+    Args:
+        model_name (str): 模型名称或路径，例如'en_core_web_lg'。
+        enable (Optional[tuple[str, ...]]): 只启用的组件，其他组件均被禁用。None为使用模型的默认设置。
+        exclude (tuple[str, ...]): 不加载的组件，可以节省加载时间和内存。
+        add_pipes (tuple[tuple[str, Optional[dict]], ...]): 加载后添加的组件和配置，例如(('textrank', {}),)。
+            需要提前导入注册组件的包，例如pytextrank。
+        max_length (Optional[int]): 设置nlp.max_length。不参与缓存的键，会修改共享的pipeline。
+
+    Returns:
+        Language: 加载的pipeline。
+    """
+    key = (
+        model_name,
+        tuple(enable) if enable is not None else None,
+        tuple(exclude),
+        json.dumps([[name, config] for name, config in add_pipes], sort_keys=True),
+    )
+    if key not in _pipelines:
+        import spacy
+
+        load_kwargs = {'exclude': list(exclude)}
+        if enable is not None:
+            load_kwargs['enable'] = list(enable)
+        nlp = spacy.load(model_name, **load_kwargs)
+        for name, config in add_pipes:
+            nlp.add_pipe(name, config=config or {})
+        _pipelines[key] = nlp
+    nlp = _pipelines[key]
+    if max_length is not None:
+        nlp.max_length = max_length
+    return nlp
+
+
+def load_blank_spacy_pipeline(
+    lang: str = 'en',
+    add_pipes: tuple[tuple[str, dict | None], ...] = (('sentencizer', None),),
+    max_length: int | None = None,
+) -> Language:
+    """
+    获取缓存的空白spacy pipeline，不需要下载模型。
+
+    默认只包含基于规则的sentencizer，用于轻量的分句。
+
+    Args:
+        lang (str): 语言代码，例如'en'。
+        add_pipes (tuple[tuple[str, Optional[dict]], ...]): 添加的组件和配置。
+        max_length (Optional[int]): 设置nlp.max_length。不参与缓存的键，会修改共享的pipeline。
+
+    Returns:
+        Language: 加载的pipeline。
+    """
+    key = (
+        f'blank:{lang}',
+        None,
+        (),
+        json.dumps([[name, config] for name, config in add_pipes], sort_keys=True),
+    )
+    if key not in _pipelines:
+        import spacy
+
+        nlp = spacy.blank(lang)
+        for name, config in add_pipes:
+            nlp.add_pipe(name, config=config or {})
+        _pipelines[key] = nlp
+    nlp = _pipelines[key]
+    if max_length is not None:
+        nlp.max_length = max_length
+    return nlp
+
+
+def clear_spacy_pipelines() -> None:
+    """
+    释放所有缓存的pipeline。
+    """
+    _pipelines.clear()
+
+
+def split_long_text(
+    text: str,
+    max_chunk_length: int,
+) -> list[str]:
+    """
+    将超长的文本切分为多个片段，每个片段不超过max_chunk_length个字符。
+
+    优先在换行处切分，其次在空白处切分，都没有时直接截断。
+
+    Returns:
+        list[str]: 顺序拼接即为原文本的片段。空文本返回一个空字符串。
+    """
+    chunks = []
+    start = 0
+    while len(text) - start > max_chunk_length:
+        end = start + max_chunk_length
+        cut = text.rfind('\n', start + 1, end)
+        if cut == -1:
+            cut = max(text.rfind(' ', start + 1, end), text.rfind('\t', start + 1, end))
+        cut = end if cut == -1 else cut + 1
+        chunks.append(text[start:cut])
+        start = cut
+    chunks.append(text[start:])
+    return chunks